@@ -0,0 +1,171 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel, create_engine
+
+from database.schema import init_db, add_missing_indexes
+from database.comparison import rebuild_product_comparisons
+from database.read_service import (
+    DEFAULT_SEARCH_LIMIT,
+    LARGEST_SPREADS_QUERY,
+    PRODUCT_PRICES_QUERY,
+    SEARCH_QUERIES,
+    brand_parameters,
+)
+
+
+"""Benchmark the read service's queries before and after the indexes and comparison table.
+
+Every query is the statement `database/read_service.py` runs, with the parameters it binds. The
+"before" run drops every secondary index and answers the spread question by aggregating
+`productprice` directly, which is what the schema allowed before `productcomparison` existed.
+The "after" run recreates the indexes, builds the comparison table and runs the same statements,
+with `LARGEST_SPREADS_QUERY` reading the comparison table.
+
+Example usage:
+    python benchmarks/bench_comparison_queries.py --products 50000
+"""
+
+
+STORES = ["loblaws", "zehrs", "fortinos", "wholesaleclub", "realcanadiansuperstore", "nofrills"]
+TYPES = ["SOLD_BY_EACH", "SOLD_BY_WEIGHT", "SOLD_BY_EACH_PRICED_BY_WEIGHT"]
+BRANDS = [f"Brand {number}" for number in range(200)]
+
+SPREADS_WITHOUT_COMPARISONS = text(
+    "SELECT product_id, MAX(price_cents) - MIN(price_cents) AS spread FROM productprice "
+    "GROUP BY product_id HAVING COUNT(*) >= :min_store_count ORDER BY spread DESC LIMIT :limit"
+)
+
+SEARCH_LIMIT = {"limit": DEFAULT_SEARCH_LIMIT}
+
+# name: (statement before, statement after, parameters)
+QUERIES = {
+    "search by brand": (
+        SEARCH_QUERIES[True, False],
+        SEARCH_QUERIES[True, False],
+        {**brand_parameters("Brand 123"), **SEARCH_LIMIT},
+    ),
+    "search by type": (
+        SEARCH_QUERIES[False, True],
+        SEARCH_QUERIES[False, True],
+        {"product_type": "SOLD_BY_WEIGHT", **SEARCH_LIMIT},
+    ),
+    "search by brand and type": (
+        SEARCH_QUERIES[True, True],
+        SEARCH_QUERIES[True, True],
+        {**brand_parameters("Brand 123"), "product_type": "SOLD_BY_WEIGHT", **SEARCH_LIMIT},
+    ),
+    "prices of a product": (
+        PRODUCT_PRICES_QUERY,
+        PRODUCT_PRICES_QUERY,
+        {"product_id": "20000000007_EA"},
+    ),
+    "largest price spreads": (
+        SPREADS_WITHOUT_COMPARISONS,
+        LARGEST_SPREADS_QUERY,
+        {"min_store_count": 2, **SEARCH_LIMIT},
+    ),
+}
+
+
+def populate(engine, product_count: int) -> None:
+    rng = random.Random(42)
+    products = []
+    prices = []
+
+    for number in range(product_count):
+        product_id = f"{20000000000 + number}_EA"
+        products.append(
+            {
+                "product_id": product_id,
+                "small_image_url": "//assets.shop.loblaws.ca/products/NoImage.png",
+                "brand_name": rng.choice(BRANDS),
+                "title_name": f"Product {number}",
+                "type": rng.choice(TYPES),
+            }
+        )
+        base_price = rng.randint(99, 2999)
+        for store in rng.sample(STORES, rng.randint(1, len(STORES))):
+            prices.append(
+                {
+                    "product_id": product_id,
+                    "store": store,
+                    "price_cents": base_price + rng.randint(-50, 50),
+                    "package_sizing": "",
+                    "updated_at": "2024-01-01 00:00:00",
+                }
+            )
+
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO productinfo (product_id, small_image_url, brand_name, title_name, type) "
+                "VALUES (:product_id, :small_image_url, :brand_name, :title_name, :type)"
+            ),
+            products,
+        )
+        connection.execute(
+            text(
+                "INSERT INTO productprice (product_id, store, price_cents, package_sizing, updated_at) "
+                "VALUES (:product_id, :store, :price_cents, :package_sizing, :updated_at)"
+            ),
+            prices,
+        )
+
+
+def drop_secondary_indexes(engine) -> None:
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            for index in table.indexes:
+                connection.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+
+
+def time_queries(engine, after: bool, repeats: int):
+    timings = {}
+    with engine.connect() as connection:
+        for name, (before_statement, after_statement, parameters) in QUERIES.items():
+            statement = after_statement if after else before_statement
+            start = time.perf_counter()
+            for _ in range(repeats):
+                connection.execute(statement, parameters).all()
+            timings[name] = (time.perf_counter() - start) / repeats * 1000
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark comparison query latency")
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        init_db(engine)
+        drop_secondary_indexes(engine)
+        populate(engine, args.products)
+
+        before = time_queries(engine, False, args.repeats)
+
+        add_missing_indexes(engine)
+        with Session(engine) as session:
+            rebuild_product_comparisons(session)
+            session.commit()
+
+        after = time_queries(engine, True, args.repeats)
+        engine.dispose()
+
+    print(f"{args.products} products, mean latency over {args.repeats} runs")
+    print(f"{'query':<32}{'before (ms)':>14}{'after (ms)':>14}{'speedup':>10}")
+    for name in QUERIES:
+        print(f"{name:<32}{before[name]:>14.2f}{after[name]:>14.2f}{before[name] / after[name]:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
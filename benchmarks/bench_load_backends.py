@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import SQLModel, create_engine
+
+from database import schema
+from database.db_operations import update_products_from_json
+from modules.snapshot_io import write_snapshot
+from bench_snapshot_formats import make_products
+
+
+"""Benchmark `update_products_from_json` on SQLite and, when given, PostgreSQL.
+
+SQLite goes through the per-product upsert loop and PostgreSQL through the COPY bulk path.
+Each backend is timed twice: a first load into empty tables, and a second load of the same
+snapshot with a tenth of the prices changed. The PostgreSQL database is emptied first.
+
+Example usage:
+    python benchmarks/bench_load_backends.py --products 20000
+    python benchmarks/bench_load_backends.py --postgres-url postgresql://localhost/scraper_bench
+"""
+
+
+def time_loads(url: str, first_snapshot: str, second_snapshot: str):
+    engine = create_engine(schema.normalize_database_url(url))
+    SQLModel.metadata.drop_all(engine)
+    schema.init_db(engine)
+    schema._engine = engine
+
+    timings = []
+    for snapshot in (first_snapshot, second_snapshot):
+        start = time.perf_counter()
+        update_products_from_json(snapshot)
+        timings.append(time.perf_counter() - start)
+
+    schema._engine = None
+    engine.dispose()
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the loader on each database backend")
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--postgres-url", help="PostgreSQL database to benchmark (its tables are dropped)")
+    args = parser.parse_args()
+
+    products = make_products(args.products)
+
+    with tempfile.TemporaryDirectory() as directory:
+        first_snapshot = os.path.join(directory, "first.json")
+        second_snapshot = os.path.join(directory, "second.json")
+        write_snapshot(products, first_snapshot)
+
+        for product in products[::10]:
+            for price in product.prices:
+                price.price_cents += 1
+        write_snapshot(products, second_snapshot)
+
+        backends = [("sqlite", f"sqlite:///{os.path.join(directory, 'bench.db')}")]
+        if args.postgres_url:
+            backends.append(("postgresql", args.postgres_url))
+
+        print(f"{args.products} products")
+        print(f"{'backend':<14}{'first load (s)':>16}{'reload (s)':>14}")
+        for name, url in backends:
+            first_seconds, second_seconds = time_loads(url, first_snapshot, second_snapshot)
+            print(f"{name:<14}{first_seconds:>16.2f}{second_seconds:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
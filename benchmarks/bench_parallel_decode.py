@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.extract_product_data import extract_product_data_from_files
+from synthetic_catalog import generate_catalog
+
+
+"""Benchmark how raw page decoding scales with the number of worker processes.
+
+Writes a synthetic set of listing pages for one domain (see `synthetic_catalog.py`) and times
+`extract_product_data_from_files` with 1, 2, 4, ... workers up to the CPU count
+(or `--max-workers`).
+
+Example usage:
+    python benchmarks/bench_parallel_decode.py --pages 300 --tiles 48
+"""
+
+
+DOMAIN = "loblaws"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark parallel raw page decoding")
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--tiles", type=int, default=48)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    cpu_count = args.max_workers
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= cpu_count:
+        worker_counts.append(worker_counts[-1] * 2)
+    if worker_counts[-1] != cpu_count:
+        worker_counts.append(cpu_count)
+
+    with tempfile.TemporaryDirectory() as directory:
+        generate_catalog(
+            directory, products=args.pages * args.tiles, banners=1, overlap=0,
+            tiles_per_page=args.tiles, empty_pages=0,
+        )
+        os.chdir(directory)
+
+        print(f"{args.pages} pages x {args.tiles} tiles, best of {args.repeats}")
+        print(f"{'workers':>8}{'seconds':>10}{'speedup':>10}")
+
+        baseline = None
+        for workers in worker_counts:
+            best = float("inf")
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                extract_product_data_from_files(DOMAIN, max_workers=workers)
+                best = min(best, time.perf_counter() - start)
+
+            baseline = baseline or best
+            print(f"{workers:>8}{best:>10.3f}{baseline / best:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
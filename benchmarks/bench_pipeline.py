@@ -0,0 +1,210 @@
+import os
+import sys
+import json
+import logging
+import tracemalloc
+
+import pytest
+
+from sqlalchemy.pool import StaticPool
+from sqlmodel import create_engine
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import schema
+from database.db_operations import update_products_from_json
+from database.read_service import invalidate_cache
+from modules.data_pipeline import convert_and_combine, save_combined_data
+from modules.extract_product_data import extract_product_data_from_files
+from scripts.extract_data import extract_data_to_json
+from synthetic_catalog import generate_catalog
+
+
+"""Regression benchmarks for every stage of the pipeline on a synthetic catalog.
+
+Runs with pytest-benchmark, on a catalog from `synthetic_catalog.py`:
+
+    - extract: `extract_product_data_from_files` for every banner.
+    - transform: `convert_and_combine`.
+    - load: `update_products_from_json` into an empty database.
+    - dump: `extract_data_to_json`.
+
+Each stage is timed with pytest-benchmark, then run once more under tracemalloc for its peak
+memory. Throughput (items per second, from the fastest round) and peak memory are compared
+against a stored baseline, and the test fails when throughput drops or peak memory grows by
+more than the tolerance. Baselines are keyed by catalog size, so runs at different scales
+don't compare against each other. Throughput depends on the machine, so baselines are recorded
+locally in the untracked `.benchmarks/pipeline_baseline.json` with `PIPELINE_BENCH_SAVE=1`;
+`benchmarks/pipeline_baseline.json` is only a committed reference from one machine, and is
+never written to unless `PIPELINE_BENCH_BASELINE` points at it. A stage without a baseline at
+the current scale fails instead of passing unchecked.
+
+The catalog and tolerances come from the environment:
+    - `PIPELINE_BENCH_PRODUCTS` (2000), `PIPELINE_BENCH_BANNERS` (3), `PIPELINE_BENCH_OVERLAP` (0.5)
+    - `PIPELINE_BENCH_THROUGHPUT_TOLERANCE` (0.2) and `PIPELINE_BENCH_MEMORY_TOLERANCE` (0.1)
+    - `PIPELINE_BENCH_BASELINE`: Baseline file (`.benchmarks/pipeline_baseline.json`)
+    - `PIPELINE_BENCH_SAVE=1`: Record this run as the new baseline instead of comparing.
+
+The file isn't named `test_*.py`, so the regular test suite doesn't pick it up.
+
+Example usage:
+    PIPELINE_BENCH_SAVE=1 python -m pytest benchmarks/bench_pipeline.py
+    python -m pytest benchmarks/bench_pipeline.py
+    PIPELINE_BENCH_PRODUCTS=50000 python -m pytest benchmarks/bench_pipeline.py --benchmark-autosave
+"""
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PRODUCTS = int(os.environ.get("PIPELINE_BENCH_PRODUCTS", "2000"))
+BANNERS = int(os.environ.get("PIPELINE_BENCH_BANNERS", "3"))
+OVERLAP = float(os.environ.get("PIPELINE_BENCH_OVERLAP", "0.5"))
+THROUGHPUT_TOLERANCE = float(os.environ.get("PIPELINE_BENCH_THROUGHPUT_TOLERANCE", "0.2"))
+MEMORY_TOLERANCE = float(os.environ.get("PIPELINE_BENCH_MEMORY_TOLERANCE", "0.1"))
+REFERENCE_BASELINE_PATH = os.path.join(REPO_ROOT, "benchmarks", "pipeline_baseline.json")
+BASELINE_PATH = os.environ.get(
+    "PIPELINE_BENCH_BASELINE", os.path.join(REPO_ROOT, ".benchmarks", "pipeline_baseline.json")
+)
+SAVE_BASELINE = os.environ.get("PIPELINE_BENCH_SAVE") == "1"
+
+ROUNDS = 3
+SCALE = f"products={PRODUCTS},banners={BANNERS},overlap={OVERLAP}"
+
+
+def memory_engine():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    schema.init_db(engine)
+    return engine
+
+
+@pytest.fixture(scope="module")
+def catalog(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("catalog")
+    level = logging.getLogger().level
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(directory)
+        stats = generate_catalog(str(directory), products=PRODUCTS, banners=BANNERS, overlap=OVERLAP)
+
+        for banner in stats.banners:
+            extract_product_data_from_files(banner, max_workers=1)
+        products = convert_and_combine(stats.banners)
+        snapshot = save_combined_data(products)
+
+        loaded_engine = memory_engine()
+        monkeypatch.setattr(schema, "_engine", loaded_engine)
+        update_products_from_json(snapshot)
+
+        yield {
+            "stats": stats,
+            "snapshot": snapshot,
+            "loaded_engine": loaded_engine,
+            "monkeypatch": monkeypatch,
+        }
+
+        invalidate_cache()
+        loaded_engine.dispose()
+
+    logging.getLogger().setLevel(level)
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    stored = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as file:
+            stored = json.load(file)
+
+    recorded = {}
+    yield stored.get(SCALE, {}), recorded
+
+    if SAVE_BASELINE and recorded:
+        stored[SCALE] = {**stored.get(SCALE, {}), **recorded}
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, "w") as file:
+            json.dump(stored, file, indent=4, sort_keys=True)
+
+
+def peak_memory(function, setup=None) -> int:
+    if setup is not None:
+        setup()
+
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(benchmark, baseline, stage, function, items, setup=None):
+    benchmark.pedantic(function, setup=setup, rounds=ROUNDS, iterations=1)
+    if benchmark.disabled:
+        return
+
+    throughput = items / benchmark.stats.stats.min
+    peak_bytes = peak_memory(function, setup)
+    benchmark.extra_info.update(items=items, items_per_second=round(throughput), peak_bytes=peak_bytes)
+
+    expected, recorded = baseline
+    recorded[stage] = {"items_per_second": throughput, "peak_bytes": peak_bytes}
+    if SAVE_BASELINE:
+        return
+    if stage not in expected:
+        pytest.fail(
+            f"{stage}: no baseline for {SCALE} in {BASELINE_PATH}. "
+            f"Record one on this machine with PIPELINE_BENCH_SAVE=1 before comparing against it "
+            f"({REFERENCE_BASELINE_PATH} is a reference from another machine, not a local baseline)."
+        )
+
+    minimum_throughput = expected[stage]["items_per_second"] * (1 - THROUGHPUT_TOLERANCE)
+    maximum_peak = expected[stage]["peak_bytes"] * (1 + MEMORY_TOLERANCE)
+    assert throughput >= minimum_throughput, (
+        f"{stage}: {throughput:,.0f} items/s is below the baseline "
+        f"{expected[stage]['items_per_second']:,.0f} items/s by more than {THROUGHPUT_TOLERANCE:.0%}"
+    )
+    assert peak_bytes <= maximum_peak, (
+        f"{stage}: peak memory {peak_bytes:,} B is above the baseline "
+        f"{expected[stage]['peak_bytes']:,} B by more than {MEMORY_TOLERANCE:.0%}"
+    )
+
+
+def test_extract_stage(benchmark, baseline, catalog):
+    stats = catalog["stats"]
+
+    def extract():
+        for banner in stats.banners:
+            extract_product_data_from_files(banner, max_workers=1)
+
+    measure(benchmark, baseline, "extract", extract, stats.listings)
+
+
+def test_transform_stage(benchmark, baseline, catalog):
+    stats = catalog["stats"]
+
+    measure(benchmark, baseline, "transform", lambda: convert_and_combine(stats.banners), stats.listings)
+
+
+def test_load_stage(benchmark, baseline, catalog):
+    def empty_database():
+        catalog["monkeypatch"].setattr(schema, "_engine", memory_engine())
+
+    measure(
+        benchmark,
+        baseline,
+        "load",
+        lambda: update_products_from_json(catalog["snapshot"]),
+        catalog["stats"].products,
+        setup=empty_database,
+    )
+
+
+def test_dump_stage(benchmark, baseline, catalog, tmp_path):
+    catalog["monkeypatch"].setattr(schema, "_engine", catalog["loaded_engine"])
+    output_file = str(tmp_path / "dump.json")
+
+    measure(benchmark, baseline, "dump", lambda: extract_data_to_json(output_file), catalog["stats"].products)
@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+import msgspec
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.records import PriceRecord, ProductRecord
+from modules.snapshot_io import SNAPSHOT_FORMATS, decode_snapshot, encode_snapshot
+
+
+"""Benchmark combined snapshot formats: encode time, decode time and size.
+
+Compares every format registered in `modules/snapshot_io.py` against the original
+`json.dump(indent=4)` / `json.load` pair on a synthetic set of combined products.
+
+Example usage:
+    python benchmarks/bench_snapshot_formats.py --products 100000
+"""
+
+
+STORES = ["loblaws", "zehrs", "fortinos", "wholesaleclub", "realcanadiansuperstore", "nofrills"]
+TYPES = ["SOLD_BY_EACH", "SOLD_BY_WEIGHT", "SOLD_BY_EACH_PRICED_BY_WEIGHT"]
+
+
+def make_products(count: int):
+    rng = random.Random(42)
+    products = []
+
+    for number in range(count):
+        price = rng.randint(99, 2999)
+        products.append(
+            ProductRecord(
+                product_id=f"{20000000000 + number}_EA",
+                small_url=f"https://assets.shop.loblaws.ca/products/{number}/b1/en/front/{number}_front_a01_@2.png",
+                brand=rng.choice([None, f"Brand {rng.randint(0, 300)}"]),
+                title=f"Synthetic product {number}",
+                type=rng.choice(TYPES),
+                prices=[
+                    PriceRecord(
+                        store=store,
+                        price_cents=price + rng.randint(-50, 50),
+                        package_sizing=f"{rng.randint(1, 12)} ea, ${price / 100:.2f}/1ea",
+                    )
+                    for store in rng.sample(STORES, rng.randint(1, len(STORES)))
+                ],
+            )
+        )
+    return products
+
+
+def best_time(function, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark combined snapshot formats")
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    products = make_products(args.products)
+    builtins = msgspec.to_builtins(products)
+
+    legacy = json.dumps(builtins, indent=4).encode("utf-8")
+    results = [
+        (
+            "json.dump(indent=4)",
+            best_time(lambda: json.dumps(builtins, indent=4), args.repeats),
+            best_time(lambda: json.loads(legacy), args.repeats),
+            len(legacy),
+        )
+    ]
+
+    for snapshot_format in SNAPSHOT_FORMATS:
+        encoded = encode_snapshot(products, snapshot_format)
+        results.append(
+            (
+                snapshot_format,
+                best_time(lambda: encode_snapshot(products, snapshot_format), args.repeats),
+                best_time(lambda: decode_snapshot(encoded), args.repeats),
+                len(encoded),
+            )
+        )
+
+    print(f"{args.products} products, best of {args.repeats}")
+    print(f"{'format':<22}{'encode (s)':>12}{'decode (s)':>12}{'size (MB)':>12}")
+    for name, encode_seconds, decode_seconds, size in results:
+        print(f"{name:<22}{encode_seconds:>12.3f}{decode_seconds:>12.3f}{size / 1_000_000:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import os
+import sys
+import random
+import argparse
+
+from typing import Dict, List, NamedTuple, Optional
+
+import msgspec
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+"""Generate synthetic listing pages shaped like the real listing API responses.
+
+Writes `raw_product_data/{banner}_raw_product_data/{banner}_raw_product_data_{n}.json` files, the
+same layout `fetch_response` leaves behind, so every later stage of the pipeline can run on them
+at any scale without touching the network.
+
+The catalog is controlled by:
+    - `products`: Number of distinct products.
+    - `banners`: Number of banners (stores / domains) listing them.
+    - `overlap`: Fraction of products listed by every banner rather than by a single one.
+    - `same_price`: Fraction of those shared listings priced the same as at their home banner,
+      which exercises the duplicate price path of `convert_and_combine`.
+
+Each banner's crawl ends with a few pages whose `productGrid` is null, like a real crawl does.
+
+Functions:
+    - `make_tile`: Builds one product tile.
+    - `listing_page`: Wraps product tiles in a listing page response.
+    - `generate_catalog`: Writes the raw pages of a synthetic catalog.
+
+Example usage:
+    generate_catalog("/tmp/catalog", products=20000, banners=3, overlap=0.6)
+    python benchmarks/synthetic_catalog.py /tmp/catalog --products 20000 --banners 3 --overlap 0.6
+"""
+
+
+BANNERS = [
+    "loblaws",
+    "nofrills",
+    "zehrs",
+    "fortinos",
+    "wholesaleclub",
+    "realcanadiansuperstore",
+    "valumart",
+    "independentcitymarket",
+    "provigo",
+    "maxi",
+]
+
+PRICING_TYPES = ["SOLD_BY_EACH", "SOLD_BY_WEIGHT", "SOLD_BY_EACH_PRICED_BY_WEIGHT"]
+
+
+class CatalogStats(NamedTuple):
+    banners: List[str]
+    products: int
+    listings: int
+    pages: int
+
+
+def make_tile(rng: random.Random, number: int, price_cents: Optional[int] = None) -> dict:
+    # Always drawn, so the same seed gives the same product whether or not the price is overridden.
+    drawn_price_cents = rng.randint(99, 3999)
+    price_cents = drawn_price_cents if price_cents is None else price_cents
+    return {
+        "productId": f"{20000000000 + number}_EA",
+        "productImage": [
+            {
+                "smallUrl": f"https://assets.shop.loblaws.ca/products/{number}/b1/en/front/{number}_front_a01_@2.png",
+                "mediumUrl": f"https://assets.shop.loblaws.ca/products/{number}/b2/en/front/{number}_front_a01_@2.png",
+            }
+        ],
+        "brand": rng.choice([None, f"Brand {rng.randint(0, 300)}"]),
+        "title": f"Synthetic product {number}",
+        "pricing": {"price": f"{price_cents // 100}.{price_cents % 100:02d}", "wasPrice": None},
+        "pricingUnits": {"type": rng.choice(PRICING_TYPES), "unit": "ea"},
+        "packageSizing": f"{rng.randint(1, 12)} ea, ${price_cents / 100:.2f}/1ea",
+        "badges": {"dealBadge": None, "textBadge": None},
+        "link": f"/synthetic-product/p/{number}",
+    }
+
+
+def listing_page(tiles: Optional[List[dict]], page_number: int = 1, total_results: int = 0) -> dict:
+    product_grid = None
+    if tiles is not None:
+        product_grid = {
+            "productTiles": tiles,
+            "pagination": {
+                "pageNumber": page_number,
+                "pageSize": len(tiles),
+                "totalResults": total_results,
+            },
+        }
+
+    return {
+        "layout": {
+            "sections": {
+                "productListingSection": {"components": [{"data": {"productGrid": product_grid}}]}
+            }
+        }
+    }
+
+
+def write_page(folder: str, banner: str, page_number: int, data: dict) -> None:
+    path = os.path.join(folder, f"{banner}_raw_product_data_{page_number}.json")
+    with open(path, "wb") as file:
+        file.write(msgspec.json.format(msgspec.json.encode(data), indent=4))
+
+
+def generate_catalog(
+    directory: str,
+    products: int = 1000,
+    banners: int = 3,
+    overlap: float = 0.5,
+    same_price: float = 0.5,
+    tiles_per_page: int = 48,
+    empty_pages: int = 3,
+    seed: int = 42,
+) -> CatalogStats:
+    if not 1 <= banners <= len(BANNERS):
+        raise ValueError(f"banners must be between 1 and {len(BANNERS)}")
+
+    rng = random.Random(seed)
+    banner_names = BANNERS[:banners]
+    listings: Dict[str, List[dict]] = {banner: [] for banner in banner_names}
+
+    for number in range(products):
+        shared = rng.random() < overlap
+        home = banner_names[number % banners]
+        tile = make_tile(random.Random(seed + number), number)
+        listings[home].append(tile)
+
+        if not shared:
+            continue
+
+        for banner in banner_names:
+            if banner == home:
+                continue
+            if rng.random() < same_price:
+                listings[banner].append(tile)
+            else:
+                price_cents = max(49, round(float(tile["pricing"]["price"]) * 100) + rng.randint(-150, 150))
+                listings[banner].append(make_tile(random.Random(seed + number), number, price_cents))
+
+    page_count = 0
+    for banner, tiles in listings.items():
+        folder = os.path.join(directory, "raw_product_data", f"{banner}_raw_product_data")
+        os.makedirs(folder, exist_ok=True)
+
+        page_number = 0
+        for page_number, start in enumerate(range(0, len(tiles), tiles_per_page), start=1):
+            write_page(
+                folder, banner, page_number, listing_page(tiles[start:start + tiles_per_page], page_number, len(tiles))
+            )
+        for offset in range(1, empty_pages + 1):
+            write_page(folder, banner, page_number + offset, listing_page(None))
+
+        page_count += page_number + empty_pages
+
+    return CatalogStats(
+        banners=banner_names,
+        products=products,
+        listings=sum(len(tiles) for tiles in listings.values()),
+        pages=page_count,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic listing pages")
+    parser.add_argument("directory", help="Directory to write raw_product_data/ into")
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--banners", type=int, default=3)
+    parser.add_argument("--overlap", type=float, default=0.5)
+    parser.add_argument("--same-price", type=float, default=0.5)
+    parser.add_argument("--tiles-per-page", type=int, default=48)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    stats = generate_catalog(
+        args.directory,
+        products=args.products,
+        banners=args.banners,
+        overlap=args.overlap,
+        same_price=args.same_price,
+        tiles_per_page=args.tiles_per_page,
+        seed=args.seed,
+    )
+    print(
+        f"Wrote {stats.pages} pages with {stats.listings} listings of {stats.products} products "
+        f"for {', '.join(stats.banners)}"
+    )
+
+
+if __name__ == "__main__":
+    main()
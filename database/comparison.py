@@ -0,0 +1,89 @@
+import logging
+import statistics
+
+from typing import Iterable, Dict, List, Tuple
+from datetime import datetime, timezone
+from collections import defaultdict
+
+from sqlmodel import Session, select, delete
+from database.schema import ProductComparison, ProductPrice
+
+
+"""Maintain the denormalized `productcomparison` table.
+
+Each row summarizes one product's prices across every store it is sold at. The loader only
+refreshes the rows of products whose prices changed in that run, so a load that touches a
+handful of prices does a handful of small queries instead of re-aggregating the whole
+`productprice` table.
+
+Functions:
+    - `summarize_prices`: Computes the comparison values for one product's store prices.
+    - `refresh_product_comparisons`: Recomputes the comparison rows for the given products.
+    - `rebuild_product_comparisons`: Recomputes the comparison rows for every product.
+
+Example usage:
+    with Session(get_engine()) as session:
+        refresh_product_comparisons(session, ["20091825001_EA"])
+        session.commit()
+"""
+
+
+# SQLite caps the number of bound parameters in a single statement.
+BATCH_SIZE = 500
+
+
+def summarize_prices(product_id: str, prices: List[Tuple[str, int]]) -> ProductComparison:
+    ordered = sorted(prices, key=lambda price: (price[1], price[0]))
+    cents = [price_cents for _, price_cents in ordered]
+
+    return ProductComparison(
+        product_id=product_id,
+        min_price_cents=cents[0],
+        max_price_cents=cents[-1],
+        median_price_cents=round(statistics.median(cents)),
+        spread_cents=cents[-1] - cents[0],
+        cheapest_store=ordered[0][0],
+        store_count=len({store for store, _ in ordered}),
+        updated_at=datetime.now(timezone.utc),
+    )
+
+
+def refresh_product_comparisons(session: Session, product_ids: Iterable[str]) -> int:
+    product_ids = list(dict.fromkeys(product_ids))
+
+    for start in range(0, len(product_ids), BATCH_SIZE):
+        batch = product_ids[start:start + BATCH_SIZE]
+
+        prices: Dict[str, List[Tuple[str, int]]] = defaultdict(list)
+        rows = session.exec(
+            select(ProductPrice.product_id, ProductPrice.store, ProductPrice.price_cents)
+            .where(ProductPrice.product_id.in_(batch))
+            .where(ProductPrice.price_cents.is_not(None))
+        )
+        for product_id, store, price_cents in rows:
+            prices[product_id].append((store, price_cents))
+
+        session.execute(
+            delete(ProductComparison).where(ProductComparison.product_id.in_(batch))
+        )
+        session.add_all(
+            summarize_prices(product_id, product_prices)
+            for product_id, product_prices in prices.items()
+        )
+        session.flush()
+
+    logging.info(f"Refreshed price comparisons for {len(product_ids)} products")
+    return len(product_ids)
+
+
+def rebuild_product_comparisons(session: Session) -> int:
+    product_ids = session.exec(select(ProductPrice.product_id).distinct()).all()
+    session.execute(delete(ProductComparison))
+    return refresh_product_comparisons(session, product_ids)
+
+
+def comparisons_need_rebuild(session: Session) -> bool:
+    """True when prices exist but the comparison table was never filled, e.g. after an upgrade."""
+    if session.exec(select(ProductComparison.product_id).limit(1)).first() is not None:
+        return False
+    return session.exec(select(ProductPrice.product_id).limit(1)).first() is not None
@@ -1,91 +1,127 @@
-import json
 import logging
+import msgspec
 
-from typing import Dict, Any
+from typing import List, Optional
 from datetime import datetime, timezone
 
 from sqlmodel import Session
-from database.schema import ProductInfo, ProductPrice, engine
+from modules.logging_setup import StageCounters
+from modules.records import ProductRecord
+from modules.snapshot_io import read_snapshot
+from database.schema import ProductInfo, ProductPrice, get_engine
+from database.read_service import bump_data_version, invalidate_cache
+from database.postgres_loader import bulk_load_products
+from database.watchlist import PriceChange, evaluate_watchlists, write_alerts_ndjson
+from database.comparison import (
+    comparisons_need_rebuild,
+    rebuild_product_comparisons,
+    refresh_product_comparisons,
+)
 
 
 """Database operations for upserting product data into the database.
 
 This module contains functions for inserting and/or updating product information in the database,
 when given a consolidated list of products in JSON format. An example of the supported JSON format 
-can be found down below.
+can be found down below. Snapshots written as NDJSON or compressed with zstd (see
+`modules/snapshot_io.py`) are detected and loaded the same way.
 
 Functions:
     - `upsert_product`: Inserts or updates a product in the database based on the product ID.
-    - `update_products_from_json`: Updates the database with product information from a JSON file.
+    - `update_products_from_json`: Updates the database with product information from a JSON file,
+      refreshes the price comparison rows of the products whose prices changed, then bumps the
+      data version that tells every read service process to drop its cache. On PostgreSQL the products are loaded in bulk with COPY and a
+      set-based merge (see `database/postgres_loader.py`) instead of one session per product.
+      The price rows changed by the run are checked against the watchlist rules (see
+      `database/watchlist.py`), and matches are stored as alerts or appended to an NDJSON file.
 
 Example usage:
     update_products_from_json("combined_product_data.json")
 """
 
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
-
+def upsert_product(
+    product_data: ProductRecord,
+    counters: Optional[StageCounters] = None,
+    price_changes: Optional[List[PriceChange]] = None,
+) -> bool:
+    """Returns True when the product is new or any of its prices changed.
 
-def upsert_product(product_data: Dict[str, Any]) -> None:
-    product_id = product_data["productId"]
+    When `price_changes` is given, a `PriceChange` is appended to it for every price row that
+    was added or whose price changed, once the product is committed.
+    """
+    counters = counters or StageCounters("upsert")
+    product_id = product_data.product_id
     current_time = datetime.now(timezone.utc)
+    prices_changed = False
+    changes = []
 
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         try:
             product = session.get(ProductInfo, product_id)
 
             if product:
-                product.small_image_url = product_data["smallUrl"]
-                product.brand_name = product_data.get("brand")
-                product.title_name = product_data["title"]
-                product.type = product_data["type"]
+                product.small_image_url = product_data.small_url
+                if product_data.local_image_path:
+                    product.local_image_path = product_data.local_image_path
+                product.brand_name = product_data.brand
+                product.title_name = product_data.title
+                product.type = product_data.type
 
                 price_dict = {price.store: price for price in product.prices}
 
-                for new_price in product_data["prices"]:
-                    store = new_price["store"]
+                for new_price in product_data.prices:
+                    store = new_price.store
                     if store in price_dict:
                         price = price_dict[store]
-                        price.price_cents = new_price["price_cents"]
-                        price.package_sizing = new_price["packageSizing"]
+                        if price.price_cents != new_price.price_cents:
+                            prices_changed = True
+                            changes.append(
+                                PriceChange(product_id, store, price.price_cents, new_price.price_cents)
+                            )
+                        price.price_cents = new_price.price_cents
+                        price.package_sizing = new_price.package_sizing
                         price.updated_at = current_time
                     else:
+                        prices_changed = True
+                        changes.append(PriceChange(product_id, store, None, new_price.price_cents))
                         product.prices.append(
                             ProductPrice(
                                 product_id=product_id,
                                 store=store,
-                                price_cents=new_price["price_cents"],
-                                package_sizing=new_price["packageSizing"],
+                                price_cents=new_price.price_cents,
+                                package_sizing=new_price.package_sizing,
                             )
                         )
-                logging.info(
-                    f"Updated product: {product_id} at {current_time.isoformat()}"
-                )
+                counters.incr("updated")
+                logging.debug("Updated product: %s at %s", product_id, current_time)
 
             else:
                 product = ProductInfo(
                     product_id=product_id,
-                    small_image_url=product_data["smallUrl"],
-                    brand_name=product_data.get("brand"),
-                    title_name=product_data["title"],
-                    type=product_data["type"],
+                    small_image_url=product_data.small_url,
+                    local_image_path=product_data.local_image_path,
+                    brand_name=product_data.brand,
+                    title_name=product_data.title,
+                    type=product_data.type,
                     prices=[
                         ProductPrice(
                             product_id=product_id,
-                            store=price["store"],
-                            price_cents=price["price_cents"],
-                            package_sizing=price["packageSizing"],
+                            store=price.store,
+                            price_cents=price.price_cents,
+                            package_sizing=price.package_sizing,
                         )
-                        for price in product_data["prices"]
+                        for price in product_data.prices
                     ],
                 )
                 session.add(product)
-                logging.info(
-                    f"Inserted new product: {product_id} at {current_time.isoformat()}"
+                prices_changed = True
+                changes.extend(
+                    PriceChange(product_id, price.store, None, price.price_cents)
+                    for price in product_data.prices
                 )
+                counters.incr("inserted")
+                logging.debug("Inserted new product: %s at %s", product_id, current_time)
 
             session.commit()
             session.refresh(product)
@@ -95,33 +131,70 @@ def upsert_product(product_data: Dict[str, Any]) -> None:
                 f"Error processing product {product_id} at {current_time.isoformat()}: {e}"
             )
             session.rollback()
+            counters.incr("failed")
+            return False
+
+    if price_changes is not None:
+        price_changes.extend(changes)
+    return prices_changed
 
 
-# Replace with msgspec later
-def update_products_from_json(json_file_path: str) -> None:
+def update_products_from_json(json_file_path: str, alerts_path: Optional[str] = None) -> None:
     try:
-        with open(json_file_path, "r") as file:
-            products_data = json.load(file)
+        products_data = read_snapshot(json_file_path)
         logging.info(f"Loaded JSON data from {json_file_path}")
 
     except FileNotFoundError:
         logging.error(f"File not found: {json_file_path}")
         return
 
-    except json.JSONDecodeError as e:
+    except msgspec.DecodeError as e:
         logging.error(f"Error decoding JSON from {json_file_path}: {e}")
         return
 
-    for product_data in products_data:
-        try:
-            upsert_product(product_data)
-        except Exception as e:
-            logging.error(
-                f"Failed to upsert product {product_data.get('productId', 'unknown')} at {datetime.now(timezone.utc).isoformat()}: {e}"
-            )
+    changed_product_ids = []
+    price_changes: List[PriceChange] = []
+    counters = StageCounters("load")
+    engine = get_engine()
+
+    if engine.dialect.name == "postgresql":
+        changed_product_ids = bulk_load_products(engine, products_data, counters, price_changes)
+
+    else:
+        for product_data in products_data:
+            try:
+                if upsert_product(product_data, counters, price_changes):
+                    changed_product_ids.append(product_data.product_id)
+            except Exception as e:
+                counters.incr("failed")
+                logging.error(
+                    f"Failed to upsert product {product_data.product_id} at {datetime.now(timezone.utc).isoformat()}: {e}"
+                )
+
+    counters.incr("price_changes", len(changed_product_ids))
+    counters.log_summary()
+
+    with Session(engine) as session:
+        if comparisons_need_rebuild(session):
+            rebuild_product_comparisons(session)
+        else:
+            refresh_product_comparisons(session, changed_product_ids)
+
+        alerts = evaluate_watchlists(session, price_changes)
+        if alerts and alerts_path:
+            write_alerts_ndjson(alerts, alerts_path)
+        elif alerts:
+            session.add_all(alerts)
+        bump_data_version(session)
+        session.commit()
+
+    invalidate_cache()
 
 
 if __name__ == "__main__":
+    from modules.logging_setup import configure_logging
+
+    configure_logging()
     update_products_from_json("combined_product_data.json")
 
 
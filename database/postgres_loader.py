@@ -0,0 +1,189 @@
+import logging
+
+from typing import List, Optional
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from modules.logging_setup import StageCounters
+from modules.records import ProductRecord
+from database.watchlist import PriceChange
+
+
+"""Bulk load path for PostgreSQL.
+
+`upsert_product` loads one product per session, which is fine for SQLite's single writer but
+leaves a server database idle most of the time. On PostgreSQL the whole snapshot is instead
+streamed with COPY into temporary staging tables and merged into `productinfo` and
+`productprice` with a handful of set-based statements, all in one transaction:
+
+    1. COPY the products and prices into `staging_productinfo` / `staging_productprice`.
+    2. Drop duplicate rows from staging, keeping the last occurrence like the per-row loader.
+    3. Collect the price rows that are new or changed, and the ids of new products.
+    4. INSERT ... ON CONFLICT DO UPDATE the products, then the prices.
+
+The staging tables are created with ON COMMIT DROP, so nothing is left behind when the load
+commits or rolls back. COPY needs the psycopg 3 driver (`pip install "psycopg[binary]"`), which
+`database/schema.py` selects for PostgreSQL URLs.
+
+Functions:
+    - `bulk_load_products`: Loads products into PostgreSQL and returns the ids whose prices changed.
+      The changed price rows are appended to `price_changes` for the watchlists when it is given.
+
+Example usage:
+    changed_product_ids = bulk_load_products(get_engine(), read_snapshot(path))
+"""
+
+
+CREATE_STAGING_TABLES = [
+    """
+    CREATE TEMP TABLE staging_productinfo (
+        position integer NOT NULL,
+        product_id text NOT NULL,
+        small_image_url text,
+        local_image_path text,
+        brand_name text,
+        title_name text,
+        type text
+    ) ON COMMIT DROP
+    """,
+    """
+    CREATE TEMP TABLE staging_productprice (
+        position integer NOT NULL,
+        product_id text NOT NULL,
+        store text NOT NULL,
+        price_cents integer,
+        package_sizing text
+    ) ON COMMIT DROP
+    """,
+]
+
+COPY_PRODUCTS = (
+    "COPY staging_productinfo (position, product_id, small_image_url, local_image_path, "
+    "brand_name, title_name, type) FROM STDIN"
+)
+
+COPY_PRICES = (
+    "COPY staging_productprice (position, product_id, store, price_cents, package_sizing) "
+    "FROM STDIN"
+)
+
+DEDUPLICATE_STAGING = [
+    text(
+        "DELETE FROM staging_productinfo s USING staging_productinfo t "
+        "WHERE s.product_id = t.product_id AND s.position < t.position"
+    ),
+    text(
+        "DELETE FROM staging_productprice s USING staging_productprice t "
+        "WHERE s.product_id = t.product_id AND s.store = t.store AND s.position < t.position"
+    ),
+]
+
+NEW_PRODUCTS_QUERY = text(
+    "SELECT s.product_id FROM staging_productinfo s "
+    "LEFT JOIN productinfo p ON p.product_id = s.product_id "
+    "WHERE p.product_id IS NULL"
+)
+
+CHANGED_PRICES_QUERY = text(
+    "SELECT s.product_id, s.store, p.price_cents, s.price_cents FROM staging_productprice s "
+    "LEFT JOIN productprice p ON p.product_id = s.product_id AND p.store = s.store "
+    "WHERE p.product_id IS NULL OR p.price_cents IS DISTINCT FROM s.price_cents "
+    "ORDER BY s.position"
+)
+
+# `xmax = 0` is only true for rows the INSERT created, which splits the merge into inserted
+# and updated counts without a second query.
+MERGE_PRODUCTS = text(
+    "INSERT INTO productinfo (product_id, small_image_url, local_image_path, brand_name, "
+    "title_name, type) "
+    "SELECT product_id, small_image_url, local_image_path, brand_name, title_name, type "
+    "FROM staging_productinfo "
+    "ON CONFLICT (product_id) DO UPDATE SET "
+    "small_image_url = EXCLUDED.small_image_url, "
+    "local_image_path = COALESCE(EXCLUDED.local_image_path, productinfo.local_image_path), "
+    "brand_name = EXCLUDED.brand_name, "
+    "title_name = EXCLUDED.title_name, "
+    "type = EXCLUDED.type "
+    "RETURNING (xmax = 0) AS inserted"
+)
+
+MERGE_PRICES = text(
+    "INSERT INTO productprice (product_id, store, price_cents, package_sizing, updated_at) "
+    "SELECT product_id, store, price_cents, package_sizing, :updated_at "
+    "FROM staging_productprice "
+    "ON CONFLICT (product_id, store) DO UPDATE SET "
+    "price_cents = EXCLUDED.price_cents, "
+    "package_sizing = EXCLUDED.package_sizing, "
+    "updated_at = EXCLUDED.updated_at"
+)
+
+
+def bulk_load_products(
+    engine: Engine,
+    products: List[ProductRecord],
+    counters: Optional[StageCounters] = None,
+    price_changes: Optional[List[PriceChange]] = None,
+) -> List[str]:
+    counters = counters or StageCounters("bulk load")
+    current_time = datetime.now(timezone.utc)
+
+    try:
+        with engine.begin() as connection:
+            for statement in CREATE_STAGING_TABLES:
+                connection.execute(text(statement))
+
+            with connection.connection.driver_connection.cursor() as cursor:
+                with cursor.copy(COPY_PRODUCTS) as copy:
+                    for position, product in enumerate(products):
+                        copy.write_row(
+                            (
+                                position,
+                                product.product_id,
+                                product.small_url,
+                                product.local_image_path,
+                                product.brand,
+                                product.title,
+                                product.type,
+                            )
+                        )
+
+                with cursor.copy(COPY_PRICES) as copy:
+                    position = 0
+                    for product in products:
+                        for price in product.prices:
+                            copy.write_row(
+                                (
+                                    position,
+                                    product.product_id,
+                                    price.store,
+                                    price.price_cents,
+                                    price.package_sizing,
+                                )
+                            )
+                            position += 1
+
+            for statement in DEDUPLICATE_STAGING:
+                connection.execute(statement)
+
+            new_product_ids = list(connection.execute(NEW_PRODUCTS_QUERY).scalars())
+            changed_prices = [PriceChange(*row) for row in connection.execute(CHANGED_PRICES_QUERY)]
+
+            for inserted in connection.execute(MERGE_PRODUCTS).scalars():
+                counters.incr("inserted" if inserted else "updated")
+            connection.execute(MERGE_PRICES, {"updated_at": current_time})
+
+    except Exception as e:
+        logging.error(
+            f"Bulk load of {len(products)} products failed at {current_time.isoformat()}: {e}"
+        )
+        counters.incr("failed", len(products))
+        return []
+
+    if price_changes is not None:
+        price_changes.extend(changed_prices)
+
+    logging.debug(f"Bulk loaded {len(products)} products at {current_time.isoformat()}")
+    return list(
+        dict.fromkeys([*new_product_ids, *(change.product_id for change in changed_prices)])
+    )
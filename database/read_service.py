@@ -0,0 +1,365 @@
+import time
+import logging
+import threading
+import msgspec
+
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Tuple
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from sqlalchemy import text
+from sqlmodel import Session
+from database.schema import DataVersion, get_engine
+
+
+"""Cached read API for comparing product prices across stores.
+
+This module answers the common comparison questions straight from the `productinfo` and
+`productprice` tables without dumping the whole database. Every query is a module level
+statement with bound parameters, so it is compiled once and reused, and the results are kept
+in an in-process LRU cache.
+
+The cache lives in each process, so it is tied to the database instead of to the loader: every
+load bumps the single row of the `dataversion` table in its own transaction (`bump_data_version`),
+and the read service drops its cache when that version differs from the one the cache was filled
+at. The version is read at most once every `VERSION_CHECK_INTERVAL_SECONDS`, so a cache hit
+stays in-process, and a `serve` process answers with the prices of the last committed load, from
+whichever process, at most that long after it commits. Loads in this process clear the cache
+right away.
+
+Functions:
+    - `cheapest_store`: Returns the store with the lowest price for a product.
+    - `price_spread`: Returns the lowest and highest price of a product and every store's price.
+    - `search_products`: Finds products by brand prefix and/or pricing type, with their lowest price.
+    - `largest_price_spreads`: Lists the products whose prices differ the most between stores.
+    - `bump_data_version`: Marks the data as changed for the caches of every process.
+    - `invalidate_cache`: Drops every cached result of this process.
+    - `serve`: Exposes the functions above over a small read-only HTTP endpoint.
+
+Example usage:
+    cheapest_store("20091825001_EA")
+    search_products(brand="PC", product_type="SOLD_BY_EACH")
+    serve(port=8000)
+"""
+
+
+CACHE_SIZE = 4096
+VERSION_CHECK_INTERVAL_SECONDS = 1.0
+DEFAULT_SEARCH_LIMIT = 50
+
+PRODUCT_PRICES_QUERY = text(
+    "SELECT store, price_cents, package_sizing FROM productprice "
+    "WHERE product_id = :product_id AND price_cents IS NOT NULL "
+    "ORDER BY price_cents, store"
+)
+
+SEARCH_SELECT = (
+    "SELECT p.product_id, p.brand_name, p.title_name, p.type, p.small_image_url, "
+    "c.min_price_cents, c.cheapest_store, c.store_count "
+    "FROM productinfo p LEFT JOIN productcomparison c ON c.product_id = p.product_id "
+)
+
+# The brand is matched as a case-insensitive prefix. The range on `lower(brand_name)` is what
+# lets both SQLite and PostgreSQL use `ix_productinfo_brand_name_lower`, and the LIKE rechecks
+# the rows the range selects, since a collation may order other strings inside the range.
+BRAND_CONDITION = (
+    "lower(p.brand_name) >= :brand_from AND lower(p.brand_name) < :brand_to "
+    "AND lower(p.brand_name) LIKE :brand_pattern ESCAPE '\\'"
+)
+
+TYPE_CONDITION = "p.type = :product_type"
+
+
+def build_search_query(by_brand: bool, by_type: bool):
+    conditions = [
+        condition
+        for condition, enabled in ((BRAND_CONDITION, by_brand), (TYPE_CONDITION, by_type))
+        if enabled
+    ]
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+    return text(f"{SEARCH_SELECT}{where}ORDER BY p.product_id LIMIT :limit")
+
+
+# One statement per combination of filters, so a filter that isn't set never appears in the
+# WHERE clause and every statement is still built once.
+SEARCH_QUERIES = {
+    (by_brand, by_type): build_search_query(by_brand, by_type)
+    for by_brand in (False, True)
+    for by_type in (False, True)
+}
+
+DATA_VERSION_QUERY = text("SELECT version FROM dataversion WHERE id = 1")
+
+BUMP_DATA_VERSION = text(
+    "UPDATE dataversion SET version = version + 1, updated_at = :updated_at WHERE id = 1"
+)
+
+LARGEST_SPREADS_QUERY = text(
+    "SELECT c.product_id, p.title_name, c.min_price_cents, c.max_price_cents, "
+    "c.median_price_cents, c.spread_cents, c.cheapest_store, c.store_count "
+    "FROM productcomparison c JOIN productinfo p ON p.product_id = c.product_id "
+    "WHERE c.store_count >= :min_store_count "
+    "ORDER BY c.spread_cents DESC, c.product_id LIMIT :limit"
+)
+
+# The data version the cached results were read at, None while the cache is empty, and when it
+# was last compared with the database.
+_cache_version: Optional[int] = None
+_version_checked_at = float("-inf")
+_cache_version_lock = threading.Lock()
+
+
+def data_version() -> int:
+    with get_engine().connect() as connection:
+        return connection.execute(DATA_VERSION_QUERY).scalar() or 0
+
+
+def bump_data_version(session: Session) -> None:
+    """Bump the data version as part of the session's transaction. The caller commits."""
+    updated_at = datetime.now(timezone.utc)
+    if session.execute(BUMP_DATA_VERSION, {"updated_at": updated_at}).rowcount == 0:
+        session.add(DataVersion(id=1, version=1, updated_at=updated_at))
+
+
+def check_cache_version() -> None:
+    global _cache_version, _version_checked_at
+
+    now = time.monotonic()
+    if now - _version_checked_at < VERSION_CHECK_INTERVAL_SECONDS:
+        return
+
+    version = data_version()
+    with _cache_version_lock:
+        _version_checked_at = now
+        if version == _cache_version:
+            return
+        if _cache_version is not None:
+            clear_caches()
+            logging.info(f"Data version changed to {version}, read service cache invalidated")
+        _cache_version = version
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _product_prices(product_id: str) -> Tuple[Tuple[str, int, str], ...]:
+    with get_engine().connect() as connection:
+        rows = connection.execute(PRODUCT_PRICES_QUERY, {"product_id": product_id})
+        return tuple(tuple(row) for row in rows)
+
+
+def brand_parameters(brand: str) -> Dict[str, str]:
+    prefix = brand.lower()
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return {
+        "brand_from": prefix,
+        "brand_to": prefix[:-1] + chr(ord(prefix[-1]) + 1),
+        "brand_pattern": f"{escaped}%",
+    }
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _search(brand: Optional[str], product_type: Optional[str], limit: int) -> Tuple[Tuple[Any, ...], ...]:
+    parameters: Dict[str, Any] = {"limit": limit}
+    if brand:
+        parameters.update(brand_parameters(brand))
+    if product_type:
+        parameters["product_type"] = product_type
+
+    with get_engine().connect() as connection:
+        rows = connection.execute(SEARCH_QUERIES[bool(brand), bool(product_type)], parameters)
+        return tuple(tuple(row) for row in rows)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _largest_spreads(min_store_count: int, limit: int) -> Tuple[Tuple[Any, ...], ...]:
+    with get_engine().connect() as connection:
+        rows = connection.execute(
+            LARGEST_SPREADS_QUERY, {"min_store_count": min_store_count, "limit": limit}
+        )
+        return tuple(tuple(row) for row in rows)
+
+
+def cheapest_store(product_id: str) -> Optional[Dict[str, Any]]:
+    check_cache_version()
+    prices = _product_prices(product_id)
+    if not prices:
+        return None
+
+    store, price_cents, package_sizing = prices[0]
+    return {
+        "productId": product_id,
+        "store": store,
+        "price_cents": price_cents,
+        "packageSizing": package_sizing,
+    }
+
+
+def price_spread(product_id: str) -> Optional[Dict[str, Any]]:
+    check_cache_version()
+    prices = _product_prices(product_id)
+    if not prices:
+        return None
+
+    min_price = prices[0][1]
+    max_price = prices[-1][1]
+    return {
+        "productId": product_id,
+        "min_price_cents": min_price,
+        "max_price_cents": max_price,
+        "spread_cents": max_price - min_price,
+        "prices": [
+            {"store": store, "price_cents": price_cents}
+            for store, price_cents, _ in prices
+        ],
+    }
+
+
+def search_products(
+    brand: Optional[str] = None,
+    product_type: Optional[str] = None,
+    limit: int = DEFAULT_SEARCH_LIMIT,
+) -> List[Dict[str, Any]]:
+    check_cache_version()
+    return [
+        {
+            "productId": product_id,
+            "brand": brand_name,
+            "title": title_name,
+            "type": pricing_type,
+            "smallUrl": small_url,
+            "min_price_cents": min_price_cents,
+            "cheapest_store": cheapest,
+            "store_count": store_count or 0,
+        }
+        for (
+            product_id,
+            brand_name,
+            title_name,
+            pricing_type,
+            small_url,
+            min_price_cents,
+            cheapest,
+            store_count,
+        ) in _search(brand, product_type, limit)
+    ]
+
+
+def largest_price_spreads(
+    min_store_count: int = 2, limit: int = DEFAULT_SEARCH_LIMIT
+) -> List[Dict[str, Any]]:
+    check_cache_version()
+    return [
+        {
+            "productId": product_id,
+            "title": title_name,
+            "min_price_cents": min_price_cents,
+            "max_price_cents": max_price_cents,
+            "median_price_cents": median_price_cents,
+            "spread_cents": spread_cents,
+            "cheapest_store": cheapest,
+            "store_count": store_count,
+        }
+        for (
+            product_id,
+            title_name,
+            min_price_cents,
+            max_price_cents,
+            median_price_cents,
+            spread_cents,
+            cheapest,
+            store_count,
+        ) in _largest_spreads(min_store_count, limit)
+    ]
+
+
+def clear_caches() -> None:
+    _product_prices.cache_clear()
+    _search.cache_clear()
+    _largest_spreads.cache_clear()
+
+
+def invalidate_cache() -> None:
+    global _cache_version, _version_checked_at
+
+    with _cache_version_lock:
+        clear_caches()
+        _cache_version = None
+        _version_checked_at = float("-inf")
+    logging.info("Read service cache invalidated")
+
+
+class ReadServiceHandler(BaseHTTPRequestHandler):
+    """Routes:
+        GET /products/<product_id>/cheapest
+        GET /products/<product_id>/spread
+        GET /products?brand=<brand>&type=<type>&limit=<limit>
+        GET /spreads?min_stores=<count>&limit=<limit>
+    """
+
+    def do_GET(self) -> None:
+        parsed = urlparse(self.path)
+        parts = [part for part in parsed.path.split("/") if part]
+
+        query = parse_qs(parsed.query)
+        try:
+            limit = int(query.get("limit", [DEFAULT_SEARCH_LIMIT])[0])
+            min_store_count = int(query.get("min_stores", [2])[0])
+        except ValueError:
+            self.send_json(400, {"error": "limit and min_stores must be integers"})
+            return
+
+        if parts == ["spreads"]:
+            self.send_json(200, largest_price_spreads(min_store_count, limit))
+            return
+
+        if parts == ["products"]:
+            self.send_json(
+                200,
+                search_products(
+                    brand=query.get("brand", [None])[0],
+                    product_type=query.get("type", [None])[0],
+                    limit=limit,
+                ),
+            )
+            return
+
+        if len(parts) == 3 and parts[0] == "products" and parts[2] in ("cheapest", "spread"):
+            lookup = cheapest_store if parts[2] == "cheapest" else price_spread
+            result = lookup(parts[1])
+
+            if result is None:
+                self.send_json(404, {"error": f"No prices found for product {parts[1]}"})
+            else:
+                self.send_json(200, result)
+            return
+
+        self.send_json(404, {"error": f"Unknown route {parsed.path}"})
+
+    def send_json(self, status: int, body: Any) -> None:
+        encoded = msgspec.json.encode(body)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug("%s - %s", self.address_string(), format % args)
+
+
+def serve(host: str = "127.0.0.1", port: int = 8000) -> None:
+    server = ThreadingHTTPServer((host, port), ReadServiceHandler)
+    logging.info(f"Read service listening on http://{host}:{port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Read service stopped")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,187 @@
+import os
+import hashlib
+import logging
+
+from typing import List, Optional, Sequence
+from datetime import datetime, timezone
+
+from sqlmodel import Session, select
+from database.schema import SnapshotRun, get_engine
+from modules.records import ProductRecord
+from modules.snapshot_io import SNAPSHOT_FORMATS, format_from_path, read_snapshot, write_snapshot
+
+
+"""Catalog of combined snapshots and their retention.
+
+Every snapshot written by `transform` is recorded in the `snapshotrun` table with its
+timestamp, domains, product and price counts, format and checksum. Finding the latest run (or
+any earlier one) is then a single indexed lookup instead of globbing `combined_product_data/`
+and comparing file timestamps, which also changes when files are copied around.
+
+Retention keeps the newest runs, deletes older ones from disk and from the catalog, and can
+compact runs past a given age into a compressed format.
+
+Functions:
+    - `file_checksum`: SHA-256 of a file.
+    - `record_run`: Adds (or refreshes) the catalog entry for a snapshot file.
+    - `latest_run` / `get_run` / `list_runs`: Look up catalog entries.
+    - `verify_run`: Checks a snapshot file against its recorded checksum.
+    - `apply_retention`: Deletes and/or compacts older snapshots.
+
+Example usage:
+    path = save_combined_data(combined_data)
+    record_run(path, "json", domains, combined_data)
+    update_products_from_json(latest_run().path)
+"""
+
+
+def file_checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def record_run(
+    path: str,
+    snapshot_format: str,
+    domains: Sequence[str],
+    products: List[ProductRecord],
+) -> SnapshotRun:
+    with Session(get_engine()) as session:
+        run = session.exec(select(SnapshotRun).where(SnapshotRun.path == path)).first()
+        if run is None:
+            run = SnapshotRun(path=path)
+
+        run.created_at = datetime.now(timezone.utc)
+        run.snapshot_format = snapshot_format
+        run.domains = ",".join(domains)
+        run.product_count = len(products)
+        run.price_count = sum(len(product.prices) for product in products)
+        run.size_bytes = os.path.getsize(path)
+        run.checksum = file_checksum(path)
+
+        session.add(run)
+        session.commit()
+        session.refresh(run)
+
+    logging.info(f"Recorded run {run.id} for {path} ({run.product_count} products)")
+    return run
+
+
+def latest_run() -> Optional[SnapshotRun]:
+    with Session(get_engine()) as session:
+        return session.exec(
+            select(SnapshotRun)
+            .order_by(SnapshotRun.created_at.desc(), SnapshotRun.id.desc())
+            .limit(1)
+        ).first()
+
+
+def get_run(run_id: int) -> Optional[SnapshotRun]:
+    with Session(get_engine()) as session:
+        return session.get(SnapshotRun, run_id)
+
+
+def list_runs(limit: Optional[int] = None) -> List[SnapshotRun]:
+    with Session(get_engine()) as session:
+        statement = select(SnapshotRun).order_by(
+            SnapshotRun.created_at.desc(), SnapshotRun.id.desc()
+        )
+        if limit is not None:
+            statement = statement.limit(limit)
+        return list(session.exec(statement).all())
+
+
+def verify_run(run: SnapshotRun) -> bool:
+    if not os.path.exists(run.path):
+        logging.error(f"Snapshot for run {run.id} is missing: {run.path}")
+        return False
+
+    if file_checksum(run.path) != run.checksum:
+        logging.error(f"Snapshot for run {run.id} does not match its checksum: {run.path}")
+        return False
+
+    return True
+
+
+def compacted_path(path: str, snapshot_format: str) -> str:
+    current_format = format_from_path(path)
+    stem = path[: -len(SNAPSHOT_FORMATS[current_format].extension)] if current_format else path
+    return f"{stem}{SNAPSHOT_FORMATS[snapshot_format].extension}"
+
+
+def compact_run(session: Session, run: SnapshotRun, snapshot_format: str) -> Optional[str]:
+    """Rewrite a run's snapshot in another format and return the superseded file, if any.
+
+    The old file is left in place so the caller can remove it once the catalog change is
+    committed; until then the catalog still points at it.
+    """
+    old_path = run.path
+    new_path = compacted_path(run.path, snapshot_format)
+    write_snapshot(read_snapshot(run.path), new_path, snapshot_format)
+
+    run.path = new_path
+    run.snapshot_format = snapshot_format
+    run.size_bytes = os.path.getsize(new_path)
+    run.checksum = file_checksum(new_path)
+    session.add(run)
+
+    return old_path if new_path != old_path else None
+
+
+def remove_files(paths: List[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.error(f"Could not remove snapshot {path}: {e}")
+
+
+def apply_retention(
+    keep_last: int,
+    compact_after: Optional[int] = None,
+    compact_format: str = "ndjson.zst",
+) -> None:
+    """Keep the newest `keep_last` runs and delete the rest.
+
+    When `compact_after` is given, kept runs older than the newest `compact_after` are rewritten
+    in `compact_format` unless they already use it. Files are only removed once the catalog
+    changes are committed, so a failed commit never leaves runs pointing at deleted snapshots.
+    """
+    if keep_last < 1:
+        raise ValueError(f"keep_last must be at least 1, got {keep_last}")
+
+    deleted = compacted = 0
+    obsolete_paths = []
+
+    with Session(get_engine()) as session:
+        runs = session.exec(
+            select(SnapshotRun).order_by(SnapshotRun.created_at.desc(), SnapshotRun.id.desc())
+        ).all()
+
+        for position, run in enumerate(runs):
+            if position >= keep_last:
+                obsolete_paths.append(run.path)
+                session.delete(run)
+                deleted += 1
+
+            elif (
+                compact_after is not None
+                and position >= compact_after
+                and run.snapshot_format != compact_format
+                and os.path.exists(run.path)
+            ):
+                old_path = compact_run(session, run, compact_format)
+                if old_path is not None:
+                    obsolete_paths.append(old_path)
+                compacted += 1
+
+        session.commit()
+
+    remove_files(obsolete_paths)
+
+    logging.info(f"Retention applied: {deleted} runs deleted, {compacted} runs compacted")
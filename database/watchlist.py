@@ -0,0 +1,207 @@
+import logging
+import msgspec
+
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from collections import defaultdict
+
+from sqlmodel import Session, select
+from database.schema import PriceAlert, ProductInfo, WatchlistRule, get_engine
+from database.comparison import BATCH_SIZE
+
+
+"""Price watchlists evaluated incrementally at load time.
+
+Watchlist rules live in the `watchlistrule` table. The loader collects a `PriceChange` for every
+price row it inserts or changes in a run and hands only those to `evaluate_watchlists`, so a
+run that changes nothing doesn't query anything. Rules are indexed by product ID, so tracking a
+few thousand products costs a dictionary lookup per changed price, not a scan of the rules.
+
+A rule fires when every condition it sets holds:
+    - `max_price_cents`: The new price is at or below this price.
+    - `min_change_percent`: The price moved by at least this many percent, up or down.
+A rule with neither condition fires on any change of the prices it selects.
+
+Matches are stored in the `pricealert` table, or appended to an NDJSON file instead.
+
+Functions:
+    - `add_rule` / `disable_rule` / `list_rules`: Manage watchlist rules.
+    - `evaluate_watchlists`: Returns the alerts fired by a run's price changes.
+    - `write_alerts_ndjson`: Appends alerts to an NDJSON file.
+    - `list_alerts`: Returns the most recent stored alerts.
+
+Example usage:
+    add_rule(product_id="20091825001_EA", max_price_cents=99)
+    add_rule(brand_name="PC", store="nofrills", min_change_percent=20)
+    update_products_from_json(path)  # evaluates the rules against the changed prices
+"""
+
+
+class PriceChange(NamedTuple):
+    product_id: str
+    store: str
+    old_price_cents: Optional[int]
+    new_price_cents: Optional[int]
+
+
+_alert_encoder = msgspec.json.Encoder()
+
+
+def add_rule(
+    product_id: Optional[str] = None,
+    brand_name: Optional[str] = None,
+    product_type: Optional[str] = None,
+    store: Optional[str] = None,
+    max_price_cents: Optional[int] = None,
+    min_change_percent: Optional[float] = None,
+) -> WatchlistRule:
+    rule = WatchlistRule(
+        product_id=product_id,
+        brand_name=brand_name,
+        type=product_type,
+        store=store,
+        max_price_cents=max_price_cents,
+        min_change_percent=min_change_percent,
+    )
+
+    with Session(get_engine()) as session:
+        session.add(rule)
+        session.commit()
+        session.refresh(rule)
+
+    logging.info(f"Added watchlist rule {rule.id}")
+    return rule
+
+
+def disable_rule(rule_id: int) -> bool:
+    with Session(get_engine()) as session:
+        rule = session.get(WatchlistRule, rule_id)
+        if rule is None:
+            return False
+
+        rule.active = False
+        session.add(rule)
+        session.commit()
+
+    logging.info(f"Disabled watchlist rule {rule_id}")
+    return True
+
+
+def list_rules(include_inactive: bool = False) -> List[WatchlistRule]:
+    with Session(get_engine()) as session:
+        statement = select(WatchlistRule).order_by(WatchlistRule.id)
+        if not include_inactive:
+            statement = statement.where(WatchlistRule.active)
+        return list(session.exec(statement).all())
+
+
+def change_percent(old_price_cents: Optional[int], new_price_cents: int) -> Optional[float]:
+    if not old_price_cents:
+        return None
+    return (new_price_cents - old_price_cents) / old_price_cents * 100
+
+
+def rule_fires(rule: WatchlistRule, change: PriceChange, percent: Optional[float]) -> bool:
+    if rule.max_price_cents is not None and change.new_price_cents > rule.max_price_cents:
+        return False
+    if rule.min_change_percent is not None and (
+        percent is None or abs(percent) < rule.min_change_percent
+    ):
+        return False
+    return True
+
+
+def load_product_attributes(
+    session: Session, product_ids: Sequence[str]
+) -> Dict[str, Tuple[Optional[str], str]]:
+    attributes = {}
+    for start in range(0, len(product_ids), BATCH_SIZE):
+        batch = product_ids[start:start + BATCH_SIZE]
+        rows = session.exec(
+            select(ProductInfo.product_id, ProductInfo.brand_name, ProductInfo.type)
+            .where(ProductInfo.product_id.in_(batch))
+        )
+        for product_id, brand_name, product_type in rows:
+            attributes[product_id] = (brand_name, product_type)
+    return attributes
+
+
+def evaluate_watchlists(session: Session, price_changes: Sequence[PriceChange]) -> List[PriceAlert]:
+    if not price_changes:
+        return []
+
+    rules = session.exec(select(WatchlistRule).where(WatchlistRule.active)).all()
+    if not rules:
+        return []
+
+    rules_by_product: Dict[Optional[str], List[WatchlistRule]] = defaultdict(list)
+    for rule in rules:
+        rules_by_product[rule.product_id].append(rule)
+    general_rules = rules_by_product.pop(None, [])
+
+    # Brand and pricing type aren't part of a price change, so they are only looked up when a
+    # rule filters on them, and only for the products that changed.
+    attributes = {}
+    if any(rule.brand_name or rule.type for rule in rules):
+        attributes = load_product_attributes(
+            session, list(dict.fromkeys(change.product_id for change in price_changes))
+        )
+
+    alerts = []
+    for change in price_changes:
+        if change.new_price_cents is None:
+            continue
+
+        candidates = rules_by_product.get(change.product_id, [])
+        if general_rules:
+            candidates = candidates + general_rules
+        if not candidates:
+            continue
+
+        brand_name, product_type = attributes.get(change.product_id, (None, None))
+        percent = change_percent(change.old_price_cents, change.new_price_cents)
+
+        for rule in candidates:
+            if rule.store is not None and rule.store != change.store:
+                continue
+            if rule.brand_name is not None and (brand_name or "").lower() != rule.brand_name.lower():
+                continue
+            if rule.type is not None and product_type != rule.type:
+                continue
+            if not rule_fires(rule, change, percent):
+                continue
+
+            alerts.append(
+                PriceAlert(
+                    rule_id=rule.id,
+                    product_id=change.product_id,
+                    store=change.store,
+                    old_price_cents=change.old_price_cents,
+                    new_price_cents=change.new_price_cents,
+                    change_percent=None if percent is None else round(percent, 2),
+                )
+            )
+
+    logging.info(
+        f"Evaluated {len(rules)} watchlist rules against {len(price_changes)} price changes: "
+        f"{len(alerts)} alerts"
+    )
+    return alerts
+
+
+def write_alerts_ndjson(alerts: List[PriceAlert], path: str) -> None:
+    with open(path, "ab") as file:
+        file.write(
+            _alert_encoder.encode_lines(
+                [alert.model_dump(mode="json", exclude={"id"}) for alert in alerts]
+            )
+        )
+
+    logging.info(f"Wrote {len(alerts)} watchlist alerts to {path}")
+
+
+def list_alerts(limit: Optional[int] = None) -> List[PriceAlert]:
+    with Session(get_engine()) as session:
+        statement = select(PriceAlert).order_by(PriceAlert.created_at.desc(), PriceAlert.id.desc())
+        if limit is not None:
+            statement = statement.limit(limit)
+        return list(session.exec(statement).all())
@@ -6,37 +6,78 @@ import glob
 import shutil
 import logging
 
-from modules.product_data_fetcher import fetch_response
-from modules.web_request_converter import curl_to_requests, fetch_request
-from modules.extract_product_data import extract_product_data_from_files
-from modules.data_pipeline import convert_and_combine, save_combined_data
+from modules.logging_setup import configure_logging
 
-from database.db_operations import update_products_from_json
-from scripts.extract_data import extract_data_to_json
 
+"""Command line entry point for the scraper.
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
+The pipeline is split into subcommands so each one only imports what it needs. Heavy
+dependencies (playwright, curl_cffi, sqlmodel) are imported inside the command handlers,
+which keeps `python main.py extract foods` from paying for the browser stack at startup.
 
+Subcommands:
+    - `harvest`: Fetches raw listing pages and extracts the product tiles per domain.
+    - `transform`: Combines the extracted products into a single snapshot.
+    - `load`: Upserts a combined snapshot into the database.
+    - `extract`: Dumps the database to a JSON file.
+    - `runs`: Lists the snapshots in the run catalog.
+    - `prune`: Deletes or compacts older snapshots.
+    - `watch`: Adds, lists or disables price watchlist rules.
+    - `alerts`: Lists the alerts the watchlist rules fired during loads.
+    - `serve`: Serves the cached price comparison API over HTTP.
+    - `run`: Runs harvest, transform and load back to back.
+
+Logging is set up once here (see `modules/logging_setup.py`); `-log-level` and `-debug-sample`
+go before the subcommand, as does `-database-url`, which overrides the `DATABASE_URL`
+environment variable (SQLite's `database.db` by default).
+
+Example usage:
+    python main.py run -all
+    python main.py -log-level DEBUG -debug-sample 0.01 run loblaws
+    python main.py -database-url postgresql://localhost/scraper load
+    python main.py harvest loblaws nofrills
+    python main.py extract foods
+    python main.py watch -brand PC -store nofrills -change 20
+"""
+
+
+# Mirrors modules.snapshot_io.SNAPSHOT_FORMATS, which isn't imported here to keep startup light.
+SNAPSHOT_FORMAT_CHOICES = ["json", "ndjson", "json.zst", "ndjson.zst"]
+
+
+def sync_extract(domains: list[str], max_workers: int | None = None) -> None:
+    from modules.product_data_fetcher import fetch_response
+    from modules.web_request_converter import curl_to_requests, fetch_request
+    from modules.extract_product_data import extract_product_data_from_files
 
-def sync_extract(domains: list[str]) -> None:
     logging.info("Starting data extraction process")
 
     for domain in domains:
         curl_command, domain = fetch_request(domain)
         fetch_response(**curl_to_requests(curl_command, domain))
-        extract_product_data_from_files(domain)
+        extract_product_data_from_files(domain, max_workers)
 
 
-def transform(domains: list[str]) -> None:
+def transform(domains: list[str], mirror_images: bool = False, snapshot_format: str = "json") -> None:
+    from modules.data_pipeline import convert_and_combine, save_combined_data
+
     logging.info(
         "Starting transformation of unprocessed data into a consolidated format"
     )
 
     combined_data = convert_and_combine(domains)
-    save_combined_data(combined_data)
+
+    if mirror_images:
+        from modules.image_cache import mirror_product_images
+
+        mirror_product_images(combined_data)
+
+    output_file = save_combined_data(combined_data, snapshot_format=snapshot_format)
+
+    if output_file:
+        from database.run_catalog import record_run
+
+        record_run(output_file, snapshot_format, domains, combined_data)
 
     if os.path.exists("consolidated_product_data"):
         shutil.rmtree("consolidated_product_data")
@@ -45,29 +86,108 @@ def transform(domains: list[str]) -> None:
         shutil.rmtree("raw_product_data")
 
 
-def load(input_json_cleaned_data: str) -> None:
+def load(input_json_cleaned_data: str, alerts_path: str | None = None) -> None:
+    from database.db_operations import update_products_from_json
+
     logging.info("Starting loading cleaned data into the database")
 
-    update_products_from_json(input_json_cleaned_data)
+    update_products_from_json(input_json_cleaned_data, alerts_path)
 
 
-def parse_arguments(supported_domains: list[str]) -> list:
-    parser = argparse.ArgumentParser(description="Webscraper CLI")
-    parser.add_argument(
-        "-all", action="store_true", help="Harvest all supported domains"
-    )
-    parser.add_argument(
-        "-extract", nargs=1, metavar="FILENAME", help="Extract data from the database to JSON"
-    )
-    parser.add_argument("domains", nargs="*", help="Specify domains to harvest")
+def extract(output_name: str) -> None:
+    from scripts.extract_data import extract_data_to_json
 
-    args = parser.parse_args()
+    extract_data_to_json(f"{output_name}.json")
+
+
+def list_runs(limit: int) -> None:
+    from database.run_catalog import list_runs as catalog_runs
+
+    for run in catalog_runs(limit):
+        print(
+            f"{run.id:>5}  {run.created_at:%Y-%m-%d %H:%M}  {run.snapshot_format:<10}  "
+            f"{run.product_count:>8} products  {run.price_count:>8} prices  "
+            f"{run.size_bytes / 1_000_000:>8.2f} MB  {run.domains}  {run.path}"
+        )
+
+
+def prune(keep_last: int, compact_after: int | None, compact_format: str) -> None:
+    from database.run_catalog import apply_retention
+
+    apply_retention(keep_last, compact_after, compact_format)
+
+
+def get_run_file(run_id: int) -> str:
+    from database.run_catalog import get_run, verify_run
+
+    run = get_run(run_id)
+    if run is None:
+        logging.error(f"Run {run_id} not found in the run catalog.")
+        sys.exit(1)
+
+    if not verify_run(run):
+        sys.exit(1)
+    return run.path
 
-    if args.extract:
-        output_file = f"{args.extract[0]}.json"
-        extract_data_to_json(output_file)
-        sys.exit(0)
 
+def watch(args: argparse.Namespace) -> None:
+    from database.watchlist import add_rule, disable_rule, list_rules
+
+    if args.disable is not None:
+        if not disable_rule(args.disable):
+            logging.error(f"Watchlist rule {args.disable} not found.")
+            sys.exit(1)
+        return
+
+    criteria = [args.product, args.brand, args.type, args.store, args.below, args.change]
+    if args.list or all(value is None for value in criteria):
+        for rule in list_rules():
+            conditions = [
+                f"{name}={value}"
+                for name, value in [
+                    ("product", rule.product_id),
+                    ("brand", rule.brand_name),
+                    ("type", rule.type),
+                    ("store", rule.store),
+                    ("below", rule.max_price_cents),
+                    ("change", rule.min_change_percent),
+                ]
+                if value is not None
+            ]
+            print(f"{rule.id:>5}  {' '.join(conditions) or 'any price change'}")
+        return
+
+    add_rule(args.product, args.brand, args.type, args.store, args.below, args.change)
+
+
+def list_alerts(limit: int) -> None:
+    from database.watchlist import list_alerts as stored_alerts
+
+    for alert in stored_alerts(limit):
+        change = "" if alert.change_percent is None else f"  {alert.change_percent:+.1f}%"
+        print(
+            f"{alert.created_at:%Y-%m-%d %H:%M}  rule {alert.rule_id:<4}  {alert.product_id:<20}  "
+            f"{alert.store:<24}  {alert.old_price_cents} -> {alert.new_price_cents}{change}"
+        )
+
+
+def serve(host: str, port: int) -> None:
+    from database.read_service import serve as serve_read_api
+
+    serve_read_api(host, port)
+
+
+def load_supported_domains(json_file: str = os.path.join("config", "supported_domains.json")) -> list[str]:
+    try:
+        with open(json_file, "r") as file:
+            return json.load(file)
+
+    except FileNotFoundError:
+        print(f"Error: {json_file} not found.")
+        sys.exit(1)
+
+
+def resolve_domains(args: argparse.Namespace, supported_domains: list[str]) -> list[str]:
     if args.all:
         return supported_domains
 
@@ -80,39 +200,249 @@ def parse_arguments(supported_domains: list[str]) -> list:
             sys.exit(1)
         return args.domains
 
-    parser.print_help()
+    print("No domains given. Pass one or more domains or use -all.")
+    print("Available domains:")
+    print("\n".join(f"- {domain}" for domain in supported_domains))
     sys.exit(1)
 
 
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def add_domain_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "-all", action="store_true", help="Use all supported domains"
+    )
+    parser.add_argument("domains", nargs="*", help="Specify domains to process")
+
+
+def add_worker_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "-workers",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Processes used to decode raw pages (defaults to the number of CPUs)",
+    )
+
+
+def add_transform_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "-images", action="store_true", help="Mirror product images into the local image cache"
+    )
+    parser.add_argument(
+        "-format",
+        default="json",
+        choices=SNAPSHOT_FORMAT_CHOICES,
+        help="Format of the combined snapshot (default: json)",
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Webscraper CLI")
+    parser.add_argument(
+        "-log-level",
+        default="INFO",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        help="Logging level (default: INFO)",
+    )
+    parser.add_argument(
+        "-debug-sample",
+        type=float,
+        default=1.0,
+        metavar="RATE",
+        help="Fraction of DEBUG messages to keep, e.g. 0.01 (default: 1.0)",
+    )
+    parser.add_argument(
+        "-database-url",
+        metavar="URL",
+        help="Database to use, e.g. postgresql://localhost/scraper (default: $DATABASE_URL or sqlite:///database.db)",
+    )
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    harvest_parser = subparsers.add_parser(
+        "harvest", help="Fetch raw listing pages and extract product tiles"
+    )
+    add_domain_arguments(harvest_parser)
+    add_worker_arguments(harvest_parser)
+
+    transform_parser = subparsers.add_parser(
+        "transform", help="Combine extracted products into a snapshot"
+    )
+    add_domain_arguments(transform_parser)
+    add_transform_arguments(transform_parser)
+
+    load_parser = subparsers.add_parser(
+        "load", help="Load a combined snapshot into the database"
+    )
+    load_parser.add_argument(
+        "file", nargs="?", help="Snapshot to load (defaults to the latest one)"
+    )
+    load_parser.add_argument(
+        "-run", type=int, metavar="ID", help="Load the snapshot of an earlier run from the run catalog"
+    )
+    load_parser.add_argument(
+        "-alerts",
+        metavar="FILE",
+        help="Append watchlist alerts to this NDJSON file instead of the alerts table",
+    )
+
+    runs_parser = subparsers.add_parser("runs", help="List the snapshots in the run catalog")
+    runs_parser.add_argument("-limit", type=int, default=20, help="Number of runs to show")
+
+    prune_parser = subparsers.add_parser(
+        "prune", help="Delete or compact older snapshots from the run catalog"
+    )
+    prune_parser.add_argument(
+        "-keep",
+        type=positive_int,
+        required=True,
+        metavar="N",
+        help="Number of most recent runs to keep (at least 1)",
+    )
+    prune_parser.add_argument(
+        "-compact-after",
+        type=int,
+        metavar="N",
+        help="Rewrite kept runs older than the newest N in a compressed format",
+    )
+    prune_parser.add_argument(
+        "-compact-format",
+        default="ndjson.zst",
+        choices=SNAPSHOT_FORMAT_CHOICES,
+        help="Format used for compacted runs (default: ndjson.zst)",
+    )
+
+    watch_parser = subparsers.add_parser(
+        "watch", help="Add, list or disable price watchlist rules"
+    )
+    watch_parser.add_argument("-product", metavar="ID", help="Only this product")
+    watch_parser.add_argument("-brand", help="Only products of this brand")
+    watch_parser.add_argument("-type", help="Only products with this pricing type")
+    watch_parser.add_argument("-store", help="Only prices at this store")
+    watch_parser.add_argument(
+        "-below", type=int, metavar="CENTS", help="Alert when the price is at or below this"
+    )
+    watch_parser.add_argument(
+        "-change", type=float, metavar="PERCENT", help="Alert when the price moves by at least this much"
+    )
+    watch_parser.add_argument("-list", action="store_true", help="List the active rules")
+    watch_parser.add_argument("-disable", type=int, metavar="ID", help="Disable a rule")
+
+    alerts_parser = subparsers.add_parser(
+        "alerts", help="List the alerts fired by the watchlist rules"
+    )
+    alerts_parser.add_argument("-limit", type=int, default=50, help="Number of alerts to show")
+
+    extract_parser = subparsers.add_parser(
+        "extract", help="Extract data from the database to JSON"
+    )
+    extract_parser.add_argument("filename", metavar="FILENAME")
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="Serve the cached price comparison API over HTTP"
+    )
+    serve_parser.add_argument("-host", default="127.0.0.1", help="Address to bind to")
+    serve_parser.add_argument("-port", type=int, default=8000, help="Port to listen on")
+
+    run_parser = subparsers.add_parser(
+        "run", help="Harvest, transform and load in one go"
+    )
+    add_domain_arguments(run_parser)
+    add_worker_arguments(run_parser)
+    add_transform_arguments(run_parser)
+
+    return parser
+
+
 def get_latest_combined_data_file(directory: str = "combined_product_data") -> str:
-    files = glob.glob(os.path.join(directory, "combined_product_data_*.json"))
+    from database.run_catalog import latest_run
+
+    run = latest_run()
+    if run is not None and os.path.exists(run.path):
+        return run.path
+
+    # Snapshots written before the run catalog existed. The UTC timestamp in the file name
+    # sorts chronologically, unlike file times, which change when files are copied.
+    files = [
+        file
+        for file in glob.glob(os.path.join(directory, "combined_product_data_*"))
+        if file.endswith(tuple(f".{snapshot_format}" for snapshot_format in SNAPSHOT_FORMAT_CHOICES))
+    ]
     if not files:
         logging.error("No combined product data files found.")
         sys.exit(1)
-    latest_file = max(files, key=os.path.getctime)
+    latest_file = max(files, key=os.path.basename)
     return latest_file
 
 
-def main(domains: list) -> None:
-    sync_extract(domains)
-    transform(domains)
+def main(
+    domains: list,
+    mirror_images: bool = False,
+    max_workers: int | None = None,
+    snapshot_format: str = "json",
+) -> None:
+    sync_extract(domains, max_workers)
+    transform(domains, mirror_images, snapshot_format)
     load(get_latest_combined_data_file())
 
 
+def run_command(args: argparse.Namespace) -> None:
+    if args.command == "extract":
+        extract(args.filename)
+
+    elif args.command == "load":
+        if args.run is not None:
+            load(get_run_file(args.run), args.alerts)
+        else:
+            load(args.file or get_latest_combined_data_file(), args.alerts)
+
+    elif args.command == "watch":
+        watch(args)
+
+    elif args.command == "alerts":
+        list_alerts(args.limit)
+
+    elif args.command == "runs":
+        list_runs(args.limit)
+
+    elif args.command == "prune":
+        prune(args.keep, args.compact_after, args.compact_format)
+
+    elif args.command == "serve":
+        serve(args.host, args.port)
+
+    else:
+        domains = resolve_domains(args, load_supported_domains())
+
+        if args.command == "harvest":
+            sync_extract(domains, args.workers)
+        elif args.command == "transform":
+            transform(domains, args.images, args.format)
+        else:
+            main(domains, args.images, args.workers, args.format)
+
+
 if __name__ == "__main__":
     # os.makedirs("logs", exist_ok=True)
     # I will need to create a logs folder in the root directory at a later time
 
-    json_file = os.path.join("config", "supported_domains.json")
-
-    try:
-        with open(json_file, "r") as file:
-            supported_domains = json.load(file)
+    parser = build_parser()
+    args = parser.parse_args()
 
-    except FileNotFoundError:
-        print(f"Error: {json_file} not found.")
+    if args.command is None:
+        parser.print_help()
         sys.exit(1)
 
-    selected_domains = parse_arguments(supported_domains)
+    configure_logging(getattr(logging, args.log_level), args.debug_sample)
+
+    if args.database_url:
+        from database.schema import configure_engine
+
+        configure_engine(args.database_url)
 
-    main(selected_domains)
+    run_command(args)
@@ -1,18 +1,14 @@
-import json
 import os
+import sys
+import msgspec
 import logging
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime, timezone
 
-from collections import defaultdict
-from datetime import datetime
-
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
+from modules.logging_setup import StageCounters
+from modules.records import PriceRecord, ProductRecord, intern_optional
+from modules.snapshot_io import DEFAULT_FORMAT, SNAPSHOT_FORMATS, write_snapshot
 
 
 """Data processing pipeline to combine and clean product data from multiple loblaw domains
@@ -22,13 +18,17 @@ product data from each domain into a single JSON file. The combined data is then
 called "combined_product_data.json" in the root directory. This combined product data is cleaned up
 from any duplicate prices and saved in a format that can be easily upserted into a database.
 
+Products are held as compact `ProductRecord` structs (see `modules/records.py`) with interned
+store, pricing type and brand strings rather than nested dicts.
+
 Functions:
     - `extract_product_info`: This is a helper function that
-      extracts relevant product information from a product object.
+      extracts relevant product information from a product object into a `ProductRecord`.
     - `add_price_if_unique`: This is a helper function that 
-      adds a price to a product if it is unique to the product.
+      adds a price to a product if it is unique to the product, and returns whether it did.
     - `convert_and_combine`: Combines product data from multiple domains into a single JSON file.
-    - `save_combined_data`: Saves the combined product data to a JSON file.
+    - `save_combined_data`: Saves the combined product data as a snapshot in one of the formats
+      from `modules/snapshot_io.py` and returns its path.
 
 Example usage:
     domains = ["loblaws", "nofrills", "zehrs"]
@@ -40,17 +40,17 @@ Example usage:
 def load_products_from_file(domain: str) -> List[Dict[str, Any]]:
     input_file = os.path.join("consolidated_product_data", f"{domain}_consolidated_product_data.json")
     try:
-        with open(input_file, "r", encoding="utf-8") as file:
+        with open(input_file, "rb") as file:
             logging.info(f"Loading products from {input_file}")
-            return json.load(file)
+            return msgspec.json.decode(file.read())
     except FileNotFoundError:
         logging.error(f"File not found: {input_file}")
-    except json.JSONDecodeError as e:
+    except msgspec.DecodeError as e:
         logging.error(f"Error decoding JSON from {input_file}: {e}")
     return []
 
 
-def extract_product_info(product: Dict[str, Any]) -> Dict[str, Any]:
+def extract_product_info(product: Dict[str, Any], domain: str) -> ProductRecord:
     product_id = product.get("productId")
 
     small_url = None
@@ -60,118 +60,108 @@ def extract_product_info(product: Dict[str, Any]) -> Dict[str, Any]:
         small_url = "//assets.shop.loblaws.ca/products/NoImage/b1/en/front/NoImage_front_a06.png"
 
     brand = product.get("brand")
-    title = product.get("title", "")
-    price_str = product.get("pricing", {}).get("price", "0")
+    title = product.get("title") or ""
+    price_str = (product.get("pricing") or {}).get("price") or "0"
     price_cents = int(float(price_str) * 100)
-    pricing_type = product.get("pricingUnits", {}).get("type", "")
-    package_sizing = product.get("packageSizing", "")
-
-    return {
-        "productId": product_id,
-        "smallUrl": small_url,
-        "brand": brand,
-        "title": title,
-        "type": pricing_type,
-        "price_cents": price_cents,
-        "packageSizing": package_sizing,
-    }
+    pricing_type = (product.get("pricingUnits") or {}).get("type") or ""
+    package_sizing = product.get("packageSizing") or ""
+
+    return ProductRecord(
+        product_id=product_id,
+        small_url=small_url,
+        brand=intern_optional(brand),
+        title=title,
+        type=sys.intern(pricing_type),
+        prices=[
+            PriceRecord(
+                store=sys.intern(domain),
+                price_cents=price_cents,
+                package_sizing=package_sizing,
+            )
+        ],
+    )
 
 
 def add_price_if_unique(
-    combined_data: Dict[str, Any],
+    combined_data: Dict[str, ProductRecord],
     product_id: str,
-    domain: str,
-    price_cents: int,
-    package_sizing: str,
-) -> None:
+    new_price: PriceRecord,
+) -> bool:
 
-    existing_prices = combined_data[product_id]["prices"]
+    existing_prices = combined_data[product_id].prices
+    domain = new_price.store
     if not any(
-        price["store"] == domain and price["price_cents"] == price_cents
+        price.store == domain and price.price_cents == new_price.price_cents
         for price in existing_prices
     ):
-        existing_prices.append(
-            {
-                "store": domain,
-                "price_cents": price_cents,
-                "packageSizing": package_sizing,
-            }
-        )
-        logging.info(f"Added unique price for product {product_id} from {domain}")
-    else:
-        logging.debug(
-            f"Duplicate price found for product {product_id} in {domain}, skipping."
-        )
-
-
-def convert_and_combine(domains: List[str]) -> List[Dict[str, Any]]:
-    combined_data = defaultdict(
-        lambda: {
-            "productId": None,
-            "smallUrl": None,
-            "brand": None,
-            "title": None,
-            "type": None,
-            "prices": [],
-        }
+        existing_prices.append(new_price)
+        logging.debug("Added unique price for product %s from %s", product_id, domain)
+        return True
+
+    logging.debug(
+        "Duplicate price found for product %s in %s, skipping.", product_id, domain
     )
+    return False
+
+
+def convert_and_combine(domains: List[str]) -> List[ProductRecord]:
+    combined_data: Dict[str, ProductRecord] = {}
+    counters = StageCounters("transform")
 
     for domain in domains:
         products = load_products_from_file(domain)
         logging.info(f"Processing {len(products)} products from {domain}")
 
         for product in products:
-            info = extract_product_info(product)
-            product_id = info["productId"]
-
-            if combined_data[product_id]["productId"] is None:
-                combined_data[product_id].update(
-                    {
-                        "productId": product_id,
-                        "smallUrl": info["smallUrl"],
-                        "brand": info["brand"],
-                        "title": info["title"],
-                        "type": info["type"],
-                    }
-                )
-                logging.debug(f"Initialized product {product_id} in combined data.")
-
-            add_price_if_unique(
-                combined_data,
-                product_id,
-                domain,
-                info["price_cents"],
-                info["packageSizing"],
-            )
-
+            info = extract_product_info(product, domain)
+            product_id = info.product_id
+
+            if product_id not in combined_data:
+                combined_data[product_id] = info
+                counters.incr("unique_prices")
+                logging.debug("Initialized product %s in combined data.", product_id)
+                continue
+
+            if add_price_if_unique(combined_data, product_id, info.prices[0]):
+                counters.incr("unique_prices")
+            else:
+                counters.incr("duplicate_prices")
+
+    counters.incr("products", len(combined_data))
+    counters.log_summary()
     logging.info("Conversion and combination of product data complete.")
     return list(combined_data.values())
 
 
-# Replace with msgspec later
 def save_combined_data(
-    combined_data: List[Dict[str, Any]],
+    combined_data: List[ProductRecord],
     output_dir: str = "combined_product_data",
     base_filename: str = "combined_product_data.json",
-) -> None:
+    snapshot_format: str = DEFAULT_FORMAT,
+) -> Optional[str]:
 
     timestamp = datetime.now(timezone.utc).strftime("%Y_%m_%d_%H_%M")
+    extension = SNAPSHOT_FORMATS[snapshot_format].extension
     output_file = os.path.join(
-        output_dir, f"{os.path.splitext(base_filename)[0]}_{timestamp}.json"
+        output_dir, f"{os.path.splitext(base_filename)[0]}_{timestamp}{extension}"
     )
 
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
 
     try:
-        with open(output_file, "w", encoding="utf-8") as file:
-            json.dump(combined_data, file, indent=4)
+        write_snapshot(combined_data, output_file, snapshot_format)
         logging.info(f"Combined data saved to {output_file}")
+        return output_file
     except IOError as e:
         logging.error(f"Failed to save combined data to {output_file}: {e}")
+        return None
 
 
 if __name__ == "__main__":
     # Example usage
+    from modules.logging_setup import configure_logging
+
+    configure_logging()
     domains = ["loblaws", "nofrills", "zehrs"]
 
     combined_data = convert_and_combine(domains)
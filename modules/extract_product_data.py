@@ -1,60 +1,99 @@
 import os
+import re
 import msgspec
 import logging
 
+from typing import List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+
+from modules.logging_setup import StageCounters
+
 
 """Extract and consolidate product data from raw JSON files.
 
+Decoding the raw pages is CPU bound, so the pages of a domain are spread over a process pool.
+Each worker decodes one page and hands back its `productTiles` already re-encoded as JSON, so
+the parent only has to splice byte strings together in page order instead of pickling and
+re-encoding every product.
+
 Functions:
+    - `list_raw_page_files`: Lists a domain's raw page files in page order.
+    - `extract_product_tiles`: Decodes one raw page and returns its product tiles as JSON bytes.
     - `extract_product_data_from_files`: Reads raw product data files, extracts product information, and saves it to a consolidated JSON file.
 
 Example usage:
     extract_product_data_from_files("loblaws")
+    extract_product_data_from_files("loblaws", max_workers=4)
 """
 
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
+def list_raw_page_files(directory_path: str, domain: str) -> List[str]:
+    page_pattern = re.compile(rf"^{re.escape(domain)}_raw_product_data_(\d+)\.json$")
+    pages = []
+
+    for file_name in os.listdir(directory_path):
+        match = page_pattern.match(file_name)
+        if match:
+            pages.append((int(match.group(1)), os.path.join(directory_path, file_name)))
+
+    return [file_path for _, file_path in sorted(pages)]
+
+
+def extract_product_tiles(input_file_path: str) -> Tuple[int, Optional[bytes]]:
+    with open(input_file_path, "rb") as file:
+        data = msgspec.json.decode(file.read())
+
+    product_grid = (
+        data.get("layout", {})
+        .get("sections", {})
+        .get("productListingSection", {})
+        .get("components", [{}])[0]
+        .get("data", {})
+        .get("productGrid")
+    )
+
+    if product_grid is None:
+        return 0, None
+
+    product_tiles = product_grid.get("productTiles", [])
+    return len(product_tiles), msgspec.json.encode(product_tiles)
 
 
-def extract_product_data_from_files(domain: str) -> None:
-    product_list = []
+def extract_product_data_from_files(domain: str, max_workers: Optional[int] = None) -> None:
     directory_path = os.path.join("raw_product_data", f"{domain}_raw_product_data")
+    page_files = list_raw_page_files(directory_path, domain)
 
-    for file_name in os.listdir(directory_path):
-        if file_name.startswith(f"{domain}_raw_product_data_") and file_name.endswith(
-            ".json"
-        ):
-            input_file_path = os.path.join(directory_path, file_name)
-
-            with open(input_file_path, "rb") as file:
-                data = msgspec.json.decode(file.read())
-
-                product_grid = (
-                    data.get("layout", {})
-                    .get("sections", {})
-                    .get("productListingSection", {})
-                    .get("components", [{}])[0]
-                    .get("data", {})
-                    .get("productGrid")
-                )
-
-                if product_grid is None:
-                    logging.warning(
-                        f"'productGrid' is null in {file_name}. Skipping this file."
-                    )
-                    continue
-
-                product_tiles = product_grid.get("productTiles", [])
-
-                logging.info(
-                    f"Extracted {len(product_tiles)} products from {file_name}"
-                )
-                product_list.extend(product_tiles)
-
-    logging.info(f"Total products extracted: {len(product_list)}")
+    max_workers = max_workers or os.cpu_count() or 1
+
+    if max_workers == 1 or len(page_files) < 2:
+        results = map(extract_product_tiles, page_files)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=max_workers)
+        results = pool.map(extract_product_tiles, page_files)
+
+    tile_chunks = []
+    counters = StageCounters(f"extract {domain}")
+
+    try:
+        for input_file_path, (tile_count, encoded_tiles) in zip(page_files, results):
+            file_name = os.path.basename(input_file_path)
+
+            if encoded_tiles is None:
+                logging.debug("'productGrid' is null in %s. Skipping this file.", file_name)
+                counters.incr("empty_pages")
+                continue
+
+            logging.debug("Extracted %d products from %s", tile_count, file_name)
+            counters.incr("pages")
+            counters.incr("products", tile_count)
+            if tile_count:
+                tile_chunks.append(encoded_tiles[1:-1])
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    counters.log_summary()
 
     output_folder = "consolidated_product_data"
     os.makedirs(output_folder, exist_ok=True)
@@ -62,7 +101,7 @@ def extract_product_data_from_files(domain: str) -> None:
         output_folder, f"{domain}_consolidated_product_data.json"
     )
 
-    encoded_json = msgspec.json.encode(product_list)
+    encoded_json = b"[" + b",".join(tile_chunks) + b"]"
     formatted_json = msgspec.json.format(encoded_json, indent=4)
 
     with open(output_file_path, "wb") as json_file:
@@ -77,4 +116,7 @@ if __name__ == "__main__":
     # raw product data. Sample raw product data files are: loblaws_raw_product_data_1.json, loblaws_raw_product_data_2.json, etc.
 
     # Example usage
+    from modules.logging_setup import configure_logging
+
+    configure_logging()
     extract_product_data_from_files("loblaws")
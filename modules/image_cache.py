@@ -0,0 +1,271 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import msgspec
+
+from typing import Callable, List, Dict, Optional, Iterable, Tuple
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from modules.records import ProductRecord
+
+
+"""Mirror product images into a local content-addressed cache.
+
+Every product carries a `smallUrl` pointing at the Loblaw CDN. This module downloads those
+images concurrently through a single pooled client and stores each one under the SHA-256 of
+its content as soon as it arrives, so identical images served from different URLs are only kept
+once and only the downloads in flight are held in memory. URLs that are already in the cache are
+not downloaded again, and the cache is kept under a size cap as it grows by evicting the least
+recently used images.
+
+Cache layout:
+    product_images/
+        index.json                  URL -> digest mapping and per-image metadata
+        ab/abcdef...0123.png        image content, named after its SHA-256 digest
+
+Functions:
+    - `normalize_image_url`: Turns protocol-relative CDN URLs into absolute HTTPS URLs.
+    - `load_index` / `save_index`: Reads and writes the cache index.
+    - `store_image`: Writes image content into the cache under its digest.
+    - `enforce_size_cap`: Evicts the least recently used images until the cache fits the cap.
+    - `mirror_product_images`: Mirrors the images of a list of combined products and records
+      the local path on each product as `local_image_path`.
+
+Example usage:
+    combined_data = convert_and_combine(domains)
+    mirror_product_images(combined_data)
+    save_combined_data(combined_data)
+"""
+
+
+DEFAULT_CACHE_DIR = "product_images"
+DEFAULT_MAX_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+DEFAULT_MAX_CONNECTIONS = 16
+INDEX_FILE_NAME = "index.json"
+
+
+class CachedImage(msgspec.Struct):
+    path: str
+    size: int
+    last_access: float
+
+
+class ImageIndex(msgspec.Struct):
+    urls: Dict[str, str] = {}
+    images: Dict[str, CachedImage] = {}
+
+
+def normalize_image_url(url: str) -> str:
+    if url.startswith("//"):
+        return f"https:{url}"
+    return url
+
+
+def load_index(cache_dir: str) -> ImageIndex:
+    index_path = os.path.join(cache_dir, INDEX_FILE_NAME)
+    try:
+        with open(index_path, "rb") as file:
+            return msgspec.json.decode(file.read(), type=ImageIndex)
+    except FileNotFoundError:
+        return ImageIndex()
+    except msgspec.DecodeError as e:
+        logging.warning(f"Image cache index {index_path} is unreadable, starting fresh: {e}")
+        return ImageIndex()
+
+
+def save_index(index: ImageIndex, cache_dir: str) -> None:
+    os.makedirs(cache_dir, exist_ok=True)
+    index_path = os.path.join(cache_dir, INDEX_FILE_NAME)
+    temp_path = f"{index_path}.tmp"
+
+    with open(temp_path, "wb") as file:
+        file.write(msgspec.json.encode(index))
+    os.replace(temp_path, index_path)
+
+
+def store_image(index: ImageIndex, cache_dir: str, url: str, content: bytes) -> str:
+    digest = hashlib.sha256(content).hexdigest()
+    now = time.time()
+
+    cached = index.images.get(digest)
+    if cached is None or not os.path.exists(os.path.join(cache_dir, cached.path)):
+        extension = os.path.splitext(urlparse(url).path)[1] or ".img"
+        relative_path = os.path.join(digest[:2], f"{digest}{extension}")
+        file_path = os.path.join(cache_dir, relative_path)
+
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as file:
+            file.write(content)
+
+        cached = CachedImage(path=relative_path, size=len(content), last_access=now)
+        index.images[digest] = cached
+
+    cached.last_access = now
+    index.urls[url] = digest
+    return digest
+
+
+def cache_size(index: ImageIndex) -> int:
+    return sum(cached.size for cached in index.images.values())
+
+
+def lru_order(index: ImageIndex) -> "OrderedDict[str, None]":
+    return OrderedDict(
+        (digest, None)
+        for digest, _ in sorted(index.images.items(), key=lambda item: item[1].last_access)
+    )
+
+
+def evict_least_recently_used(
+    index: ImageIndex,
+    cache_dir: str,
+    lru: "OrderedDict[str, None]",
+    total_bytes: int,
+    max_bytes: int,
+) -> Tuple[int, int]:
+    """Evicts images from the front of `lru` until `total_bytes` fits `max_bytes`.
+
+    Returns the new total and the number of images evicted. The URLs of evicted images are left
+    in `index.urls` until `drop_evicted_urls`, so evicting one image doesn't rebuild the map.
+    """
+    evicted = 0
+
+    while total_bytes > max_bytes and lru:
+        digest, _ = lru.popitem(last=False)
+        cached = index.images.pop(digest)
+
+        try:
+            os.remove(os.path.join(cache_dir, cached.path))
+        except FileNotFoundError:
+            pass
+
+        total_bytes -= cached.size
+        evicted += 1
+
+    return total_bytes, evicted
+
+
+def drop_evicted_urls(index: ImageIndex) -> None:
+    index.urls = {url: digest for url, digest in index.urls.items() if digest in index.images}
+
+
+def enforce_size_cap(index: ImageIndex, cache_dir: str, max_bytes: int) -> int:
+    _, evicted = evict_least_recently_used(
+        index, cache_dir, lru_order(index), cache_size(index), max_bytes
+    )
+
+    if evicted:
+        drop_evicted_urls(index)
+        logging.info(f"Evicted {evicted} images to keep the cache under {max_bytes} bytes")
+
+    return evicted
+
+
+def is_cached(index: ImageIndex, cache_dir: str, url: str) -> bool:
+    digest = index.urls.get(url)
+    if digest is None or digest not in index.images:
+        return False
+    return os.path.exists(os.path.join(cache_dir, index.images[digest].path))
+
+
+async def download_images(
+    urls: Iterable[str],
+    max_connections: int,
+    on_image: Callable[[str, bytes], None],
+) -> None:
+    """Downloads `urls` over `max_connections` connections, handing each image to `on_image`
+    as soon as it arrives, so at most `max_connections` images are held in memory."""
+    from curl_cffi.requests import AsyncSession
+
+    pending = iter(urls)
+
+    async with AsyncSession(max_clients=max_connections, impersonate="chrome") as session:
+
+        async def download(url: str) -> Optional[bytes]:
+            try:
+                response = await session.get(url)
+            except Exception as e:
+                logging.warning(f"Failed to download image {url}: {e}")
+                return None
+
+            if response.status_code != 200:
+                logging.warning(f"Image request for {url} returned status {response.status_code}")
+                return None
+            return response.content
+
+        # Each worker pulls the next URL from the shared iterator once its download is stored.
+        async def worker() -> None:
+            for url in pending:
+                content = await download(url)
+                if content is not None:
+                    on_image(url, content)
+
+        await asyncio.gather(*(worker() for _ in range(max_connections)))
+
+
+def mirror_product_images(
+    products: List[ProductRecord],
+    cache_dir: str = DEFAULT_CACHE_DIR,
+    max_bytes: int = DEFAULT_MAX_CACHE_BYTES,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+) -> Dict[str, str]:
+    index = load_index(cache_dir)
+
+    urls = {normalize_image_url(product.small_url) for product in products if product.small_url}
+    missing = [url for url in urls if not is_cached(index, cache_dir, url)]
+
+    now = time.time()
+    for url in urls.difference(missing):
+        index.images[index.urls[url]].last_access = now
+
+    logging.info(f"Mirroring {len(missing)} new images, {len(urls) - len(missing)} already cached")
+
+    # The cap is enforced as images arrive rather than once at the end, so a first run over the
+    # whole catalog never grows the cache past it.
+    lru = lru_order(index)
+    cache_bytes, evicted = evict_least_recently_used(
+        index, cache_dir, lru, cache_size(index), max_bytes
+    )
+    downloaded = 0
+
+    def on_image(url: str, content: bytes) -> None:
+        nonlocal cache_bytes, downloaded, evicted
+
+        known_images = len(index.images)
+        digest = store_image(index, cache_dir, url, content)
+        if len(index.images) > known_images:
+            cache_bytes += index.images[digest].size
+        lru[digest] = None
+        lru.move_to_end(digest)
+        downloaded += 1
+
+        cache_bytes, newly_evicted = evict_least_recently_used(
+            index, cache_dir, lru, cache_bytes, max_bytes
+        )
+        evicted += newly_evicted
+
+    if missing:
+        asyncio.run(download_images(missing, max_connections, on_image))
+
+    drop_evicted_urls(index)
+    if evicted:
+        logging.info(f"Evicted {evicted} images to keep the cache under {max_bytes} bytes")
+    save_index(index, cache_dir)
+
+    local_paths = {
+        url: os.path.join(cache_dir, index.images[digest].path)
+        for url, digest in index.urls.items()
+        if url in urls
+    }
+
+    for product in products:
+        if product.small_url:
+            product.local_image_path = local_paths.get(normalize_image_url(product.small_url))
+
+    logging.info(
+        f"Image mirroring complete: {downloaded} downloaded, {len(local_paths)} of {len(urls)} images available locally"
+    )
+    return local_paths
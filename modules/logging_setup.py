@@ -0,0 +1,119 @@
+import sys
+import atexit
+import logging
+import logging.handlers
+
+from queue import SimpleQueue
+from collections import Counter
+from typing import Optional, TextIO
+
+
+"""Central, non-blocking logging setup.
+
+Modules only call `logging.info(...)` and friends; the entry point calls `configure_logging`
+once. Records are put on an in-process queue by a `QueueHandler` and formatted and written by
+a `QueueListener` on a background thread, so the hot loops never wait on the terminal.
+
+Per-item messages in the hot loops (one per price, per row, per page) are counted with
+`StageCounters` and logged once as a summary at the end of the stage. The per-item details
+are still available at DEBUG level, optionally sampled so a debug run doesn't drown in output.
+
+Classes:
+    - `DebugSampler`: Lets through one in every N DEBUG records.
+    - `StageCounters`: Aggregates per-item events of a pipeline stage into one summary line.
+
+Functions:
+    - `configure_logging`: Installs the queue handler and starts the background listener.
+    - `shutdown_logging`: Flushes the queue and stops the listener.
+
+Example usage:
+    configure_logging(level=logging.DEBUG, debug_sample_rate=0.01)
+    counters = StageCounters("transform")
+    counters.incr("unique_prices")
+    counters.log_summary()
+"""
+
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class DebugSampler(logging.Filter):
+    def __init__(self, sample_rate: float) -> None:
+        super().__init__()
+        self.every = max(1, round(1 / sample_rate)) if sample_rate > 0 else 0
+        self.seen = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.DEBUG:
+            return True
+        if not self.every:
+            return False
+
+        self.seen += 1
+        return (self.seen - 1) % self.every == 0
+
+
+class _InProcessQueueHandler(logging.handlers.QueueHandler):
+    # The queue never leaves the process, so the record can be handed over as is and
+    # formatted on the listener thread instead of in the caller.
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class StageCounters:
+    def __init__(self, stage: str) -> None:
+        self.stage = stage
+        self.counts: Counter = Counter()
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        self.counts[name] += amount
+
+    def __getitem__(self, name: str) -> int:
+        return self.counts[name]
+
+    def summary(self) -> str:
+        details = ", ".join(f"{name}={count}" for name, count in self.counts.items())
+        return f"{self.stage}: {details or 'nothing to report'}"
+
+    def log_summary(self, level: int = logging.INFO) -> None:
+        logging.log(level, self.summary())
+
+
+def configure_logging(
+    level: int = logging.INFO,
+    debug_sample_rate: float = 1.0,
+    stream: Optional[TextIO] = None,
+) -> None:
+    global _listener
+
+    shutdown_logging()
+
+    output_handler = logging.StreamHandler(stream or sys.stderr)
+    output_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    queue: SimpleQueue = SimpleQueue()
+    queue_handler = _InProcessQueueHandler(queue)
+    if debug_sample_rate < 1.0:
+        queue_handler.addFilter(DebugSampler(debug_sample_rate))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(queue, output_handler)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
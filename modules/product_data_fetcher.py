@@ -1,18 +1,47 @@
 from curl_cffi import requests as cr
-import re
 import msgspec
 import os
 import time
 import random
 import logging
-from typing import Dict
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from modules.logging_setup import StageCounters
 
 
 """Fetch and store paginated product data from API requests.
 
 This module retrieves paginated JSON data from an API and saves each page's response as a formatted JSON file.
 
+The captured payload is parsed into a template once, and every request sets
+`listingInfo.pagination.from` (the page number) and `listingInfo.pagination.size` on a copy of it.
+Before crawling, the largest page size the API accepts is probed from `PAGE_SIZE_CANDIDATES`,
+largest first. A size is accepted when the first page comes back complete. If a later page is
+rejected or comes back truncated, the crawl steps down to the next smaller size and resumes
+from the first product of the failed page, so nothing is skipped. If no candidate is accepted,
+the page size from the captured payload is kept.
+
+The headers captured by `fetch_request` (session ids, cart id, API key) can expire during a long
+crawl. A 401 or 403 is never saved as a page: `ListingSession` recaptures the request for that
+domain with Playwright on a background thread, swaps in the fresh headers and session fields of
+the payload, and retries the same page. After `MAX_HEADER_REFRESHES` failed attempts in a row
+the crawl stops with an error instead of running on as if the catalog had ended. The recapture
+is given `REFRESH_TIMEOUT_SECONDS`, after which Playwright gives up and closes its browser, and a
+recapture that times out, fails or comes back without a payload counts as a failed attempt.
+
+Classes:
+    - `ListingSession`: Sends listing requests and refreshes expired headers.
+
 Functions:
+    - `parse_payload`: Decodes the captured JSON payload into a template.
+    - `build_payload`: Renders the template for a page number and page size.
+    - `get_product_grid`: Returns the 'productGrid' of a decoded response, or None.
+    - `recapture_request`: Captures a fresh listing request for a domain with Playwright.
+    - `refresh_request`: Runs a recapture on a background thread and waits for it.
+    - `is_truncated`: Checks whether a page holds fewer products than it should.
+    - `is_complete_first_page`: Checks whether a probed first page can be trusted.
+    - `probe_page_size`: Finds the largest accepted page size and returns its first page.
     - `fetch_response`: Executes API requests for each page of product data, checks response status, 
       and logs successes or access restrictions. Calls `response_serialization` for each response.
     - `response_serialization`: Decodes, formats, and saves the JSON response to a domain-specific 
@@ -25,54 +54,289 @@ Example usage:
 """
 
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+# Largest first. The last one is the size the site itself requests.
+PAGE_SIZE_CANDIDATES = [500, 250, 100, 48]
+
+# Statuses the API answers with when it refuses the requested page size.
+REJECTED_STATUSES = {400, 413, 422}
+
+# Statuses the API answers with once the captured headers have expired.
+AUTH_FAILURE_STATUSES = {401, 403}
+MAX_HEADER_REFRESHES = 3
+REFRESH_TIMEOUT_SECONDS = 120
+
+
+def parse_payload(payload: str) -> Dict[str, Any]:
+    template = msgspec.json.decode(payload.encode("utf-8"))
+    template.setdefault("listingInfo", {}).setdefault("pagination", {})
+    return template
+
+
+def build_payload(template: Dict[str, Any], page_number: int, page_size: Optional[int] = None) -> str:
+    pagination = dict(template["listingInfo"]["pagination"], **{"from": page_number})
+    if page_size is not None:
+        pagination["size"] = page_size
+
+    listing_info = dict(template["listingInfo"], pagination=pagination)
+    return msgspec.json.encode(dict(template, listingInfo=listing_info)).decode("utf-8")
+
+
+def get_product_grid(data: Any) -> Optional[Dict[str, Any]]:
+    try:
+        return data["layout"]["sections"]["productListingSection"]["components"][0]["data"]["productGrid"]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+def recapture_request(domain: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+    # Imported here so the fetcher only loads Playwright when a refresh is actually needed.
+    from modules.web_request_converter import curl_to_requests, fetch_request
+
+    curl_command, domain = fetch_request(domain, timeout)
+    return curl_to_requests(curl_command, domain)
+
 
+def refresh_request(
+    domain: str,
+    recapture: Callable[[str, Optional[float]], Dict[str, Any]] = recapture_request,
+    timeout: float = REFRESH_TIMEOUT_SECONDS,
+) -> Optional[Dict[str, Any]]:
+    """Runs `recapture(domain, timeout)` on a background thread and waits up to `timeout`.
+
+    Playwright's sync API refuses to run inside an event loop, so the capture gets a thread of
+    its own rather than borrowing the caller's. The recapture gets the same timeout so it stops
+    and closes its browser on its own, and the thread is a daemon, so a capture that overruns
+    is abandoned without keeping the interpreter alive at exit.
+    """
+    outcome: Dict[str, Any] = {}
+
+    def capture() -> None:
+        try:
+            outcome["request"] = recapture(domain, timeout)
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=capture, name=f"refresh-{domain}", daemon=True)
+    thread.start()
+    thread.join(timeout)
+
+    if thread.is_alive():
+        logging.error(f"Recapturing the listing request for {domain} timed out after {timeout}s")
+        return None
+    if "error" in outcome:
+        logging.error(f"Could not recapture the listing request for {domain}: {outcome['error']!r}")
+        return None
+    return outcome["request"]
+
+
+class ListingSession:
+    def __init__(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        payload: str,
+        domain: str,
+        recapture: Callable[[str, Optional[float]], Dict[str, Any]] = recapture_request,
+        counters: Optional[StageCounters] = None,
+    ) -> None:
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.template = parse_payload(payload)
+        self.domain = domain
+        self.recapture = recapture
+        self.counters = counters or StageCounters(f"fetch {domain}")
+
+    def send(self, page_number: int, page_size: Optional[int]) -> Any:
+        return cr.request(
+            self.method,
+            self.url,
+            headers=self.headers,
+            data=build_payload(self.template, page_number, page_size),
+            impersonate="chrome",
+        )
+
+    def request(self, page_number: int, page_size: Optional[int]) -> Any:
+        """Sends a page request, refreshing the headers and retrying while it fails auth."""
+        response = self.send(page_number, page_size)
+
+        for attempt in range(1, MAX_HEADER_REFRESHES + 1):
+            if response.status_code not in AUTH_FAILURE_STATUSES:
+                break
+
+            logging.warning(
+                f"Request for page {page_number} returned status {response.status_code}; "
+                f"recapturing headers for {self.domain} (attempt {attempt}/{MAX_HEADER_REFRESHES})."
+            )
+            if not self.refresh():
+                break
+            response = self.send(page_number, page_size)
+
+        return response
+
+    def refresh(self) -> bool:
+        fresh_request = refresh_request(self.domain, self.recapture)
+        if fresh_request is None:
+            return False
+        if not fresh_request.get("payload"):
+            logging.error(
+                f"Recaptured {fresh_request.get('method')} request for {self.domain} has no payload; "
+                f"keeping the expired headers."
+            )
+            return False
 
-def fetch_response(method: str, url: str, headers: Dict[str, str], payload: str, domain: str) -> None:
+        # The new payload carries the new cart and session ids; the listing part (filters, sort,
+        # pagination) stays as captured at the start of the run.
+        fresh_template = parse_payload(fresh_request["payload"])
+        self.template = dict(fresh_template, listingInfo=self.template["listingInfo"])
+        self.method = fresh_request["method"]
+        self.url = fresh_request["url"]
+        self.headers = fresh_request["headers"]
+        self.counters.incr("header_refreshes")
+        logging.info(f"Recaptured headers for {self.domain}.")
+        return True
+
+
+def is_truncated(product_grid: Optional[Dict[str, Any]], page_number: int, page_size: int) -> bool:
+    """True when a page holds fewer than `page_size` products although more should follow.
+
+    The grid's own pagination block (`totalResults` or `hasMore`) says whether more products
+    exist. Without it a short page can't be told apart from the last page, so it isn't
+    treated as truncated.
+    """
+    if not product_grid:
+        return False
+
+    tile_count = len(product_grid.get("productTiles") or [])
+    if tile_count >= page_size:
+        return False
+
+    pagination = product_grid.get("pagination") or {}
+    total_results = pagination.get("totalResults")
+    if total_results is not None:
+        return (page_number - 1) * page_size + tile_count < total_results
+    return bool(pagination.get("hasMore"))
+
+
+def is_complete_first_page(product_grid: Optional[Dict[str, Any]], page_size: int) -> bool:
+    # Stricter than `is_truncated`: an API that silently caps the page size looks exactly like a
+    # short catalog unless the grid reports its total, so a short page is only trusted with one.
+    if not product_grid:
+        return False
+
+    tile_count = len(product_grid.get("productTiles") or [])
+    total_results = (product_grid.get("pagination") or {}).get("totalResults")
+    return tile_count == page_size or (tile_count > 0 and tile_count == total_results)
+
+
+def probe_page_size(
+    session: ListingSession, candidates: Sequence[int] = PAGE_SIZE_CANDIDATES
+) -> Tuple[Optional[int], Any]:
+    """Returns the largest accepted page size and the first page fetched with it.
+
+    Returns `(None, None)` when every candidate is rejected or truncated, and `(None, response)`
+    when the request keeps failing auth, so the caller can report it.
+    """
+    for page_size in candidates:
+        response = session.request(1, page_size)
+
+        if response.status_code in AUTH_FAILURE_STATUSES:
+            return None, response
+
+        if response.status_code != 200:
+            logging.debug(f"Page size {page_size} rejected with status {response.status_code}.")
+            continue
+
+        product_grid = get_product_grid(msgspec.json.decode(response.content))
+        if not is_complete_first_page(product_grid, page_size):
+            logging.debug(f"Page size {page_size} returned a truncated first page.")
+            continue
+
+        logging.info(f"Using page size {page_size}.")
+        return page_size, response
+
+    logging.info("No page size candidate was accepted; using the captured payload's page size.")
+    return None, None
+
+
+def fetch_response(
+    method: str,
+    url: str,
+    headers: Dict[str, str],
+    payload: str,
+    domain: str,
+    page_sizes: Sequence[int] = PAGE_SIZE_CANDIDATES,
+    recapture: Callable[[str, Optional[float]], Dict[str, Any]] = recapture_request,
+) -> None:
     output_folder = os.path.join("raw_product_data", f"{domain}_raw_product_data")
     os.makedirs(output_folder, exist_ok=True)
 
+    counters = StageCounters(f"fetch {domain}")
+    session = ListingSession(method, url, headers, payload, domain, recapture, counters)
+    page_sizes: List[int] = sorted(page_sizes, reverse=True)
+    page_size, response = probe_page_size(session, page_sizes)
+
     consecutive_none_count = 0
     pagination_number = 1
+    file_number = 1
 
     while consecutive_none_count < 3:
-        updated_payload = re.sub(
-            r'("from":\s*\d+)', f'"from": {pagination_number}', payload
-        )
+        if response is None:
+            response = session.request(pagination_number, page_size)
 
-        response = cr.request(
-            method, url, headers=headers, data=updated_payload, impersonate="chrome"
-        )
+        counters.incr(f"status_{response.status_code}")
 
         if response.status_code == 200:
-            logging.info(
-                f"Request for page {pagination_number} succeeded with status 200."
-            )
+            logging.debug("Request for page %d succeeded with status 200.", pagination_number)
 
-        elif response.status_code == 403:
-            logging.warning(
-                f"Request for page {pagination_number} returned forbidden status 403."
+        elif response.status_code in AUTH_FAILURE_STATUSES:
+            logging.error(
+                f"Request for page {pagination_number} still returned status {response.status_code} "
+                f"after recapturing the headers; stopping {domain} here. Pages from {pagination_number} on were not fetched."
             )
+            break
 
         else:
             logging.info(
                 f"Request for page {pagination_number} returned status {response.status_code}."
             )
 
-        response_serialization(response.text, pagination_number, output_folder, domain)
-        logging.info(f"{domain}_raw_product_data_{pagination_number} created.")
+        smaller_sizes = [size for size in page_sizes if page_size and size < page_size]
+        if smaller_sizes and (
+            response.status_code in REJECTED_STATUSES
+            or (
+                response.status_code == 200
+                and is_truncated(
+                    get_product_grid(msgspec.json.decode(response.content)),
+                    pagination_number,
+                    page_size,
+                )
+            )
+        ):
+            # Resume from the first product of the failed page at the smaller size.
+            first_product = (pagination_number - 1) * page_size
+            page_size = smaller_sizes[0]
+            pagination_number = first_product // page_size + 1
+            counters.incr("page_size_fallbacks")
+            logging.warning(
+                f"Page was rejected or truncated; falling back to page size {page_size} from page {pagination_number}."
+            )
+            response = None
+            continue
+
+        response_serialization(response.text, file_number, output_folder, domain)
+        counters.incr("pages_saved")
+        logging.debug("%s_raw_product_data_%d created.", domain, file_number)
 
         file_path = os.path.join(
-            output_folder, f"{domain}_raw_product_data_{pagination_number}.json"
+            output_folder, f"{domain}_raw_product_data_{file_number}.json"
         )
 
         if check_product_grid_value(file_path):
             consecutive_none_count += 1
-            logging.info(
-                f"Consecutive 'productGrid is None' count: {consecutive_none_count}"
-            )
+            counters.incr("empty_pages")
+            logging.debug("Consecutive 'productGrid is None' count: %d", consecutive_none_count)
 
         else:
             consecutive_none_count = 0
@@ -84,8 +348,12 @@ def fetch_response(method: str, url: str, headers: Dict[str, str], payload: str,
             break
 
         pagination_number += 1
+        file_number += 1
+        response = None
         time.sleep(random.normalvariate(0.5, 0.05))
 
+    counters.log_summary()
+
 
 def response_serialization(raw_response: str, pagination_number: int, output_folder: str, domain: str) -> None:
     response_data = msgspec.json.decode(raw_response.encode("utf-8"))
@@ -114,7 +382,10 @@ def check_product_grid_value(file_path: str) -> bool:
 
 if __name__ == "__main__":
     # Import functions from web_request_converter.py
-    from web_request_converter import curl_to_requests, fetch_request
+    from modules.logging_setup import configure_logging
+    from modules.web_request_converter import curl_to_requests, fetch_request
+
+    configure_logging()
 
     # Example usage
     curl_command, domain = fetch_request("loblaws")
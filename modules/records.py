@@ -0,0 +1,98 @@
+import sys
+import logging
+import msgspec
+
+from typing import List, Optional
+
+
+"""Compact record types for combined product data.
+
+A combined snapshot holds hundreds of thousands of prices that repeat the same handful of store
+names, pricing types and brands. These msgspec Structs replace the nested dicts used before:
+they have no per-instance `__dict__`, are not tracked by the garbage collector, and their
+repeated strings are interned so every record points at a single shared copy.
+
+The field names are renamed on encode/decode so the records serialize to the same JSON shape
+as the original snapshots (`productId`, `smallUrl`, `packageSizing`, ...), which keeps older
+snapshot files loadable.
+
+Classes:
+    - `PriceRecord`: The price of a product at one store.
+    - `ProductRecord`: A product and its array of per-store prices.
+
+Functions:
+    - `intern_product`: Interns the store, pricing type and brand strings of a record.
+    - `encode_products`: Encodes a list of records to JSON bytes.
+    - `decode_products`: Decodes JSON bytes into a list of interned records. A record that
+      doesn't match the types is logged and skipped, so one bad product can't fail a snapshot.
+
+Example usage:
+    products = decode_products(file.read())
+    cheapest = min(products[0].prices, key=lambda price: price.price_cents)
+"""
+
+
+class PriceRecord(msgspec.Struct, gc=False, rename={"package_sizing": "packageSizing"}):
+    store: str
+    price_cents: Optional[int]
+    package_sizing: str
+
+
+class ProductRecord(
+    msgspec.Struct,
+    gc=False,
+    kw_only=True,
+    rename={
+        "product_id": "productId",
+        "small_url": "smallUrl",
+        "local_image_path": "localImagePath",
+    },
+):
+    product_id: str
+    small_url: str
+    brand: Optional[str] = None
+    title: str
+    type: str
+    prices: List[PriceRecord] = []
+    local_image_path: Optional[str] = None
+
+
+def intern_optional(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+def intern_product(product: ProductRecord) -> ProductRecord:
+    product.type = sys.intern(product.type)
+    product.brand = intern_optional(product.brand)
+    for price in product.prices:
+        price.store = sys.intern(price.store)
+    return product
+
+
+_encoder = msgspec.json.Encoder()
+_decoder = msgspec.json.Decoder(List[ProductRecord])
+_raw_decoder = msgspec.json.Decoder(List[msgspec.Raw])
+_product_decoder = msgspec.json.Decoder(ProductRecord)
+
+
+def encode_products(products: List[ProductRecord]) -> bytes:
+    return _encoder.encode(products)
+
+
+def decode_product(data: bytes, position: int) -> Optional[ProductRecord]:
+    try:
+        return intern_product(_product_decoder.decode(data))
+    except msgspec.ValidationError as e:
+        logging.error(f"Skipping product {position} of the snapshot: {e}")
+        return None
+
+
+def decode_products(data: bytes) -> List[ProductRecord]:
+    try:
+        return [intern_product(product) for product in _decoder.decode(data)]
+    except msgspec.ValidationError:
+        # Only a snapshot with a bad record pays for decoding the products one by one.
+        products = (
+            decode_product(raw, position) for position, raw in enumerate(_raw_decoder.decode(data))
+        )
+        return [product for product in products if product is not None]
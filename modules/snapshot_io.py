@@ -0,0 +1,185 @@
+import os
+import msgspec
+
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from modules.records import ProductRecord, decode_product, decode_products, encode_products
+
+
+"""Read and write combined product snapshots in several formats.
+
+Snapshots used to be written with `json.dump(indent=4)`, which is slow to produce and large on
+disk. This module encodes them with msgspec instead and supports a few interchangeable formats:
+
+    - `json`: A compact JSON array, the same shape as the original snapshots.
+    - `ndjson`: One product per line.
+    - `json.zst` / `ndjson.zst`: The formats above compressed with zstandard.
+
+Readers don't need to be told the format. Every registered format has a detector that sniffs
+the start of the encoded bytes: the first non-whitespace byte for JSON (`[`) and NDJSON (`{`),
+and the zstandard frame magic plus the first bytes of the decompressed stream for the
+compressed formats. `decode_snapshot` asks the registry once and decodes with the format that
+matched, so older indented JSON snapshots, files with the "wrong" extension and formats added
+with `register_format` load as well.
+
+Functions:
+    - `register_format`: Adds a snapshot format to the registry.
+    - `format_from_path`: Picks a format from a file name's extension.
+    - `detect_format`: Detects the format of encoded snapshot bytes.
+    - `encode_snapshot` / `decode_snapshot`: Convert between records and bytes.
+    - `write_snapshot` / `read_snapshot`: Convert between records and files.
+
+Example usage:
+    write_snapshot(combined_data, "combined_product_data_2024_12_01_10_00.ndjson.zst")
+    products = read_snapshot("combined_product_data_2024_12_01_10_00.ndjson.zst")
+"""
+
+
+DEFAULT_FORMAT = "json"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ZSTD_LEVEL = 3
+# How much of a snapshot the detectors look at, decompressed when the snapshot is compressed.
+SNIFF_BYTES = 64
+
+
+class SnapshotFormat(NamedTuple):
+    extension: str
+    encode: Callable[[List[ProductRecord]], bytes]
+    decode: Callable[[bytes], List[ProductRecord]]
+    detect: Optional[Callable[[bytes], bool]] = None
+
+
+_line_encoder = msgspec.json.Encoder()
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise RuntimeError(
+            "zstd snapshots need the 'zstandard' package: pip install zstandard"
+        ) from e
+    return zstandard
+
+
+def compress(data: bytes) -> bytes:
+    return _zstandard().ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+
+def decompress(data: bytes) -> bytes:
+    return _zstandard().ZstdDecompressor().decompressobj().decompress(data)
+
+
+def decompress_head(data: bytes, size: int = SNIFF_BYTES) -> bytes:
+    with _zstandard().ZstdDecompressor().stream_reader(data) as reader:
+        return reader.read(size)
+
+
+def first_byte(data: bytes) -> bytes:
+    return data[:SNIFF_BYTES].lstrip()[:1]
+
+
+def is_json_array(data: bytes) -> bool:
+    return first_byte(data) == b"["
+
+
+def is_ndjson(data: bytes) -> bool:
+    # An empty snapshot encodes to no lines at all.
+    return first_byte(data) in (b"{", b"")
+
+
+def encode_ndjson(products: List[ProductRecord]) -> bytes:
+    return _line_encoder.encode_lines(products)
+
+
+def decode_ndjson(data: bytes) -> List[ProductRecord]:
+    products = (
+        decode_product(line, position)
+        for position, line in enumerate(line for line in data.splitlines() if line.strip())
+    )
+    return [product for product in products if product is not None]
+
+
+SNAPSHOT_FORMATS: Dict[str, SnapshotFormat] = {}
+
+
+def register_format(
+    name: str,
+    extension: str,
+    encode: Callable[[List[ProductRecord]], bytes],
+    decode: Callable[[bytes], List[ProductRecord]],
+    detect: Optional[Callable[[bytes], bool]] = None,
+) -> None:
+    """`detect` gets the encoded bytes and returns True when they are in this format. Formats
+    without a detector are only used when they are named or picked from a file extension."""
+    SNAPSHOT_FORMATS[name] = SnapshotFormat(extension, encode, decode, detect)
+
+
+def compressed(
+    encode: Callable[[List[ProductRecord]], bytes],
+    decode: Callable[[bytes], List[ProductRecord]],
+    detect: Callable[[bytes], bool],
+) -> Tuple[
+    Callable[[List[ProductRecord]], bytes],
+    Callable[[bytes], List[ProductRecord]],
+    Callable[[bytes], bool],
+]:
+    return (
+        lambda products: compress(encode(products)),
+        lambda data: decode(decompress(data)),
+        lambda data: data.startswith(ZSTD_MAGIC) and detect(decompress_head(data)),
+    )
+
+
+register_format("json", ".json", encode_products, decode_products, is_json_array)
+register_format("ndjson", ".ndjson", encode_ndjson, decode_ndjson, is_ndjson)
+register_format("json.zst", ".json.zst", *compressed(encode_products, decode_products, is_json_array))
+register_format("ndjson.zst", ".ndjson.zst", *compressed(encode_ndjson, decode_ndjson, is_ndjson))
+
+
+def format_from_path(path: str) -> Optional[str]:
+    # Longest extension first, so the more specific one wins when two registered extensions overlap.
+    for name, snapshot_format in sorted(
+        SNAPSHOT_FORMATS.items(), key=lambda item: len(item[1].extension), reverse=True
+    ):
+        if path.endswith(snapshot_format.extension):
+            return name
+    return None
+
+
+def detect_format(data: bytes) -> str:
+    for name, snapshot_format in SNAPSHOT_FORMATS.items():
+        if snapshot_format.detect is not None and snapshot_format.detect(data):
+            return name
+    raise msgspec.DecodeError(f"Unrecognized snapshot format, starting with {data[:16]!r}")
+
+
+def encode_snapshot(products: List[ProductRecord], snapshot_format: str = DEFAULT_FORMAT) -> bytes:
+    if snapshot_format not in SNAPSHOT_FORMATS:
+        raise ValueError(
+            f"Unknown snapshot format '{snapshot_format}'. Available formats: {', '.join(SNAPSHOT_FORMATS)}"
+        )
+    return SNAPSHOT_FORMATS[snapshot_format].encode(products)
+
+
+def decode_snapshot(data: bytes) -> List[ProductRecord]:
+    return SNAPSHOT_FORMATS[detect_format(data)].decode(data)
+
+
+def write_snapshot(
+    products: List[ProductRecord], path: str, snapshot_format: Optional[str] = None
+) -> str:
+    snapshot_format = snapshot_format or format_from_path(path) or DEFAULT_FORMAT
+    encoded = encode_snapshot(products, snapshot_format)
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(encoded)
+    os.replace(temp_path, path)
+
+    return snapshot_format
+
+
+def read_snapshot(path: str) -> List[ProductRecord]:
+    with open(path, "rb") as file:
+        return decode_snapshot(file.read())
@@ -24,43 +24,46 @@ Example usage:
 """
 
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
-
-
-def fetch_request(domain: str) -> Tuple[str, str]:
+def fetch_request(domain: str, timeout: Optional[float] = None) -> Tuple[str, str]:
+    """`timeout` (in seconds) bounds every Playwright wait; the browser is closed either way."""
     url = f"https://www.{domain}.ca/food/c/27985"
+    timeout_ms = timeout * 1000 if timeout is not None else None
 
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-
-        with page.expect_response(
-            "https://api.pcexpress.ca/pcx-bff/api/v2/listingPage/27985"
-        ) as response_info:
-            page.goto(url)
-
-        captured_response = response_info.value
-        response_status = captured_response.status
-
-        if response_status == 200:
-            logging.info(
-                f"Request to {captured_response.url} succeeded with status 200."
-            )
-        elif response_status == 403:
-            logging.warning(
-                f"Request to {captured_response.url} returned forbidden status 403."
-            )
-        else:
-            logging.info(
-                f"Request to {captured_response.url} failed with status {response_status}."
-            )
-
-        captured_request = captured_response.request
-        curl_command = request_to_curl(captured_request)
-
-        browser.close()
+        browser = p.chromium.launch(headless=True, timeout=timeout_ms)
+
+        try:
+            page = browser.new_page()
+            if timeout_ms is not None:
+                page.set_default_timeout(timeout_ms)
+                page.set_default_navigation_timeout(timeout_ms)
+
+            with page.expect_response(
+                "https://api.pcexpress.ca/pcx-bff/api/v2/listingPage/27985"
+            ) as response_info:
+                page.goto(url)
+
+            captured_response = response_info.value
+            response_status = captured_response.status
+
+            if response_status == 200:
+                logging.info(
+                    f"Request to {captured_response.url} succeeded with status 200."
+                )
+            elif response_status == 403:
+                logging.warning(
+                    f"Request to {captured_response.url} returned forbidden status 403."
+                )
+            else:
+                logging.info(
+                    f"Request to {captured_response.url} failed with status {response_status}."
+                )
+
+            captured_request = captured_response.request
+            curl_command = request_to_curl(captured_request)
+
+        finally:
+            browser.close()
 
     return curl_command, domain
 
@@ -102,6 +105,10 @@ def curl_to_requests(curl_command: str, domain: str) -> Dict[str, Optional[str]]
 
 
 if __name__ == "__main__":
+    from modules.logging_setup import configure_logging
+
+    configure_logging()
+
     # Example usage
     curl_command, domain = fetch_request("loblaws")
     request_details = curl_to_requests(curl_command, domain)
@@ -1,7 +1,8 @@
-import json
 import logging
+import msgspec
 from sqlmodel import Session, select
-from database.schema import ProductInfo, engine
+from database.schema import ProductInfo, get_engine
+from modules.records import PriceRecord, ProductRecord, encode_products
 
 
 """Script to return a snapshot of the product data from the db.
@@ -16,44 +17,41 @@ Example usage:
 """
 
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
-
-
 def extract_data_to_json(output_file: str) -> None:
     logging.info(f"Beginning to extract data from database into {output_file}")
     
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         statement = select(ProductInfo)
         products = session.exec(statement).all()
 
         data = []
         for product in products:
-            product_data = {
-                "productId": product.product_id,
-                "smallUrl": product.small_image_url,
-                "brand": product.brand_name,
-                "title": product.title_name,
-                "type": product.type,
-                "prices": [
-                    {
-                        "store": price.store,
-                        "price_cents": price.price_cents,
-                        "packageSizing": price.package_sizing,
-                    }
+            product_data = ProductRecord(
+                product_id=product.product_id,
+                small_url=product.small_image_url,
+                local_image_path=product.local_image_path,
+                brand=product.brand_name,
+                title=product.title_name,
+                type=product.type,
+                prices=[
+                    PriceRecord(
+                        store=price.store,
+                        price_cents=price.price_cents,
+                        package_sizing=price.package_sizing,
+                    )
                     for price in product.prices
                 ],
-            }
+            )
             data.append(product_data)
 
-        # Replace with msgspec later
-        with open(output_file, "w") as file:
-            json.dump(data, file, indent=4)
+        with open(output_file, "wb") as file:
+            file.write(msgspec.json.format(encode_products(data), indent=4))
 
         logging.info(f"Data extracted to {output_file}")
 
 
 if __name__ == "__main__":
+    from modules.logging_setup import configure_logging
+
+    configure_logging()
     extract_data_to_json("foods.json")
\ No newline at end of file
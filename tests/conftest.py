@@ -0,0 +1,25 @@
+import pytest
+
+from sqlalchemy.pool import StaticPool
+from sqlmodel import create_engine
+
+from database import schema
+from database.read_service import invalidate_cache
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    test_engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    schema.init_db(test_engine)
+    monkeypatch.setattr(schema, "_engine", test_engine)
+    invalidate_cache()
+
+    yield test_engine
+
+    invalidate_cache()
+    test_engine.dispose()
+
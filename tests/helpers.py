@@ -0,0 +1,48 @@
+import json
+
+from database.db_operations import update_products_from_json
+from modules.records import PriceRecord, ProductRecord
+
+
+"""Factories for the products the tests load, shared so every test builds them the same way."""
+
+
+def snapshot_product(product_id, prices, brand=None, title=None, product_type="SOLD_BY_EACH"):
+    """A product as written to a combined snapshot. `prices` holds `(store, cents)` or
+    `(store, cents, package sizing)` tuples."""
+    return {
+        "productId": product_id,
+        "smallUrl": f"//assets.shop.loblaws.ca/products/{product_id}.png",
+        "brand": brand,
+        "title": title or f"Product {product_id}",
+        "type": product_type,
+        "prices": [
+            {"store": store, "price_cents": cents, "packageSizing": sizing[0] if sizing else "1ea"}
+            for store, cents, *sizing in prices
+        ],
+    }
+
+
+def product_record(
+    product_id, prices, brand=None, title=None, product_type="SOLD_BY_EACH", local_image_path=None
+):
+    """The same product as `snapshot_product`, as the `ProductRecord` the loaders take."""
+    return ProductRecord(
+        product_id=product_id,
+        small_url=f"//assets.shop.loblaws.ca/products/{product_id}.png",
+        brand=brand,
+        title=title or f"Product {product_id}",
+        type=product_type,
+        prices=[
+            PriceRecord(store, cents, sizing[0] if sizing else "1ea") for store, cents, *sizing in prices
+        ],
+        local_image_path=local_image_path,
+    )
+
+
+def load_snapshot(tmp_path, products, alerts_path=None):
+    """Writes `products` as a combined snapshot, loads it and returns its path."""
+    path = tmp_path / "combined_product_data.json"
+    path.write_text(json.dumps(products))
+    update_products_from_json(str(path), alerts_path)
+    return path
@@ -0,0 +1,124 @@
+import os
+import sys
+import time
+import subprocess
+
+import pytest
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Generous enough for a cold interpreter on a slow CI box, tight enough to catch a
+# subcommand that starts importing playwright or the database stack again.
+STARTUP_BUDGET_SECONDS = float(os.environ.get("CLI_STARTUP_BUDGET_SECONDS", "1.5"))
+# Multiplies every per-subcommand import budget below, for slower machines.
+IMPORT_BUDGET_SCALE = float(os.environ.get("CLI_IMPORT_BUDGET_SCALE", "1"))
+
+HEAVY_MODULES = ["playwright", "curl_cffi", "sqlmodel", "sqlalchemy"]
+
+SCRAPER_MODULES = ["playwright", "curl_cffi", "modules.product_data_fetcher", "modules.web_request_converter"]
+DATABASE_MODULES = ["sqlmodel", "sqlalchemy", "database.schema"]
+# Optional or backend specific, imported only when a snapshot is compressed or the database is PostgreSQL.
+OPTIONAL_MODULES = ["zstandard", "psycopg"]
+
+# For each subcommand: the modules its handler imports in `main.py`, the time budget for
+# importing them in a fresh interpreter, and the modules they must not pull in.
+SUBCOMMAND_IMPORTS = {
+    "harvest": (
+        ["modules.product_data_fetcher", "modules.web_request_converter", "modules.extract_product_data"],
+        1.0,
+        [*DATABASE_MODULES, *OPTIONAL_MODULES, "modules.data_pipeline"],
+    ),
+    "transform": (
+        ["modules.data_pipeline", "database.run_catalog"],
+        1.5,
+        [*SCRAPER_MODULES, *OPTIONAL_MODULES, "modules.image_cache", "database.db_operations"],
+    ),
+    "load": (
+        ["database.db_operations"],
+        1.5,
+        [*SCRAPER_MODULES, *OPTIONAL_MODULES, "modules.data_pipeline", "modules.image_cache"],
+    ),
+    "extract": (
+        ["scripts.extract_data"],
+        1.5,
+        [*SCRAPER_MODULES, *OPTIONAL_MODULES, "modules.data_pipeline", "database.db_operations"],
+    ),
+    "runs": (
+        ["database.run_catalog"],
+        1.5,
+        [*SCRAPER_MODULES, *OPTIONAL_MODULES, "modules.data_pipeline", "database.db_operations"],
+    ),
+    "watch": (
+        ["database.watchlist"],
+        1.5,
+        [*SCRAPER_MODULES, *OPTIONAL_MODULES, "modules.snapshot_io", "database.db_operations"],
+    ),
+    "serve": (
+        ["database.read_service"],
+        1.5,
+        [*SCRAPER_MODULES, *OPTIONAL_MODULES, "modules.snapshot_io", "database.db_operations"],
+    ),
+}
+SUBCOMMAND_IMPORTS["prune"] = SUBCOMMAND_IMPORTS["runs"]
+SUBCOMMAND_IMPORTS["alerts"] = SUBCOMMAND_IMPORTS["watch"]
+
+
+def run_python(args, cwd=REPO_ROOT):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    return subprocess.run(
+        [sys.executable, *args], cwd=cwd, env=env, capture_output=True, text=True
+    )
+
+
+@pytest.mark.parametrize("command", ["harvest", "transform", "load", "extract", "runs", "prune", "watch", "alerts", "serve", "run"])
+def test_subcommand_cold_start_within_budget(command):
+    start = time.perf_counter()
+    result = run_python(["main.py", command, "-h"])
+    elapsed = time.perf_counter() - start
+
+    assert result.returncode == 0, result.stderr
+    assert elapsed < STARTUP_BUDGET_SECONDS, (
+        f"'{command}' took {elapsed:.2f}s to start (budget {STARTUP_BUDGET_SECONDS}s)"
+    )
+
+
+def test_cli_does_not_import_heavy_dependencies():
+    result = run_python(
+        ["-c", "import sys, main; main.build_parser(); print(' '.join(sys.modules))"]
+    )
+
+    assert result.returncode == 0, result.stderr
+    loaded = result.stdout.split()
+    for module in HEAVY_MODULES:
+        assert module not in loaded
+
+
+@pytest.mark.parametrize("command", sorted(SUBCOMMAND_IMPORTS))
+def test_subcommand_handler_imports_within_budget(command):
+    handler_modules, budget, forbidden_modules = SUBCOMMAND_IMPORTS[command]
+    script = (
+        "import sys, time, importlib\n"
+        "start = time.perf_counter()\n"
+        f"for name in {handler_modules!r}:\n"
+        "    importlib.import_module(name)\n"
+        "print(time.perf_counter() - start)\n"
+        "print(' '.join(sys.modules))\n"
+    )
+    result = run_python(["-c", script])
+
+    assert result.returncode == 0, result.stderr
+    elapsed, loaded = result.stdout.splitlines()
+    budget *= IMPORT_BUDGET_SCALE
+    assert float(elapsed) < budget, (
+        f"'{command}' took {float(elapsed):.2f}s to import its handler (budget {budget:.2f}s)"
+    )
+    unexpected = [module for module in forbidden_modules if module in loaded.split()]
+    assert not unexpected, f"'{command}' imports {', '.join(unexpected)}"
+
+
+def test_importing_schema_does_not_create_database(tmp_path):
+    result = run_python(["-c", "import database.schema"], cwd=tmp_path)
+
+    assert result.returncode == 0, result.stderr
+    assert not (tmp_path / "database.db").exists()
@@ -0,0 +1,80 @@
+import json
+
+from sqlmodel import Session, select, delete
+
+from database.schema import ProductComparison
+from database.comparison import summarize_prices
+from database.read_service import largest_price_spreads
+from tests.helpers import load_snapshot, snapshot_product
+
+
+PRODUCTS = [
+    snapshot_product(
+        "20091825001_EA",
+        [
+            ("loblaws", 100, "1 bunch, $1.00/1ea"),
+            ("nofrills", 129, "1 bunch, $1.29/1ea"),
+            ("zehrs", 89, "1 bunch, $0.89/1ea"),
+        ],
+        title="Cilantro",
+    ),
+    snapshot_product(
+        "20143381001_KG",
+        [("loblaws", 79, "$6.61/1kg $3.00/1lb"), ("nofrills", 69, "$5.79/1kg $2.63/1lb")],
+        title="Roma Tomatoes",
+        product_type="SOLD_BY_EACH_PRICED_BY_WEIGHT",
+    ),
+]
+
+
+def comparisons(engine):
+    with Session(engine) as session:
+        return {row.product_id: row for row in session.exec(select(ProductComparison))}
+
+
+def test_summarize_prices():
+    summary = summarize_prices("p", [("loblaws", 100), ("nofrills", 129), ("zehrs", 89)])
+
+    assert summary.min_price_cents == 89
+    assert summary.max_price_cents == 129
+    assert summary.median_price_cents == 100
+    assert summary.spread_cents == 40
+    assert summary.cheapest_store == "zehrs"
+    assert summary.store_count == 3
+
+
+def test_loader_fills_comparison_table(engine, tmp_path):
+    load_snapshot(tmp_path, PRODUCTS)
+
+    rows = comparisons(engine)
+    assert rows["20091825001_EA"].cheapest_store == "zehrs"
+    assert rows["20143381001_KG"].median_price_cents == 74
+    assert [product["productId"] for product in largest_price_spreads()] == [
+        "20091825001_EA",
+        "20143381001_KG",
+    ]
+
+
+def test_loader_only_refreshes_changed_products(engine, tmp_path):
+    load_snapshot(tmp_path, PRODUCTS)
+    before = comparisons(engine)
+
+    updated = json.loads(json.dumps(PRODUCTS))
+    updated[1]["prices"][0]["price_cents"] = 59
+    load_snapshot(tmp_path, updated)
+    after = comparisons(engine)
+
+    assert after["20091825001_EA"].updated_at == before["20091825001_EA"].updated_at
+    assert after["20143381001_KG"].updated_at > before["20143381001_KG"].updated_at
+    assert after["20143381001_KG"].cheapest_store == "loblaws"
+
+
+def test_loader_rebuilds_missing_comparisons(engine, tmp_path):
+    load_snapshot(tmp_path, PRODUCTS)
+    with Session(engine) as session:
+        session.execute(delete(ProductComparison))
+        session.commit()
+
+    load_snapshot(tmp_path, PRODUCTS)
+
+    assert set(comparisons(engine)) == {"20091825001_EA", "20143381001_KG"}
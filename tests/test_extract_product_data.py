@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from modules.extract_product_data import extract_product_data_from_files, list_raw_page_files
+
+
+DOMAIN = "loblaws"
+
+
+def listing_page(tiles):
+    product_grid = None if tiles is None else {"productTiles": tiles}
+    return {
+        "layout": {
+            "sections": {
+                "productListingSection": {"components": [{"data": {"productGrid": product_grid}}]}
+            }
+        }
+    }
+
+
+@pytest.fixture
+def raw_pages(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    folder = tmp_path / "raw_product_data" / f"{DOMAIN}_raw_product_data"
+    folder.mkdir(parents=True)
+
+    for page in range(1, 13):
+        tiles = None if page == 5 else [
+            {"productId": f"{page}_{tile}", "title": f"Product {tile} on page {page}"}
+            for tile in range(3)
+        ]
+        (folder / f"{DOMAIN}_raw_product_data_{page}.json").write_text(json.dumps(listing_page(tiles)))
+
+    (folder / "notes.txt").write_text("not a page")
+    return folder
+
+
+def consolidated_product_ids(tmp_path):
+    output = tmp_path / "consolidated_product_data" / f"{DOMAIN}_consolidated_product_data.json"
+    return [tile["productId"] for tile in json.loads(output.read_text())]
+
+
+def test_list_raw_page_files_is_in_page_order(raw_pages):
+    names = [path.rsplit("_", 1)[1] for path in list_raw_page_files(str(raw_pages), DOMAIN)]
+
+    assert names == [f"{page}.json" for page in range(1, 13)]
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_extraction_merges_pages_in_order(raw_pages, tmp_path, max_workers):
+    extract_product_data_from_files(DOMAIN, max_workers=max_workers)
+
+    assert consolidated_product_ids(tmp_path) == [
+        f"{page}_{tile}" for page in range(1, 13) if page != 5 for tile in range(3)
+    ]
+
+
+def test_single_cpu_extracts_in_process(raw_pages, tmp_path, monkeypatch, mocker):
+    monkeypatch.setattr("modules.extract_product_data.os.cpu_count", lambda: 1)
+    pool = mocker.patch("modules.extract_product_data.ProcessPoolExecutor")
+
+    extract_product_data_from_files(DOMAIN)
+
+    pool.assert_not_called()
+    assert len(consolidated_product_ids(tmp_path)) == 11 * 3
@@ -0,0 +1,169 @@
+import os
+import asyncio
+import threading
+
+import pytest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from modules.records import ProductRecord
+from modules import image_cache
+from modules.image_cache import (
+    download_images,
+    load_index,
+    mirror_product_images,
+    normalize_image_url,
+)
+
+
+IMAGES = {
+    "/products/1_front.png": b"\x89PNG cilantro",
+    "/products/2_front.png": b"\x89PNG roma tomatoes",
+    "/products/NoImage_front.png": b"\x89PNG no image",
+    "/products/NoImage_copy.png": b"\x89PNG no image",
+}
+
+
+@pytest.fixture
+def image_server():
+    requests_seen = []
+
+    class ImageHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_seen.append(self.path)
+            content = IMAGES.get(self.path)
+
+            if content is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f"http://127.0.0.1:{server.server_port}", requests_seen
+
+    server.shutdown()
+    server.server_close()
+
+
+def make_products(base_url, paths):
+    return [
+        ProductRecord(
+            product_id=f"product_{number}",
+            small_url=f"{base_url}{path}",
+            title=f"Product {number}",
+            type="SOLD_BY_EACH",
+        )
+        for number, path in enumerate(paths)
+    ]
+
+
+def test_normalize_image_url():
+    assert normalize_image_url("//assets.shop.loblaws.ca/a.png") == "https://assets.shop.loblaws.ca/a.png"
+    assert normalize_image_url("https://assets.shop.loblaws.ca/a.png") == "https://assets.shop.loblaws.ca/a.png"
+
+
+def test_mirror_deduplicates_identical_content(image_server, tmp_path):
+    base_url, _ = image_server
+    products = make_products(base_url, list(IMAGES))
+
+    mirror_product_images(products, cache_dir=str(tmp_path))
+
+    index = load_index(str(tmp_path))
+    assert len(index.urls) == 4
+    assert len(index.images) == 3
+    assert products[2].local_image_path == products[3].local_image_path
+
+    for product in products:
+        with open(product.local_image_path, "rb") as file:
+            assert file.read() == IMAGES[product.small_url[len(base_url):]]
+
+
+def test_mirror_skips_cached_urls(image_server, tmp_path):
+    base_url, requests_seen = image_server
+    products = make_products(base_url, ["/products/1_front.png", "/products/2_front.png"])
+
+    mirror_product_images(products, cache_dir=str(tmp_path))
+    assert len(requests_seen) == 2
+
+    mirror_product_images(products, cache_dir=str(tmp_path))
+    assert len(requests_seen) == 2
+    assert all(os.path.exists(product.local_image_path) for product in products)
+
+
+def test_missing_images_have_no_local_path(image_server, tmp_path):
+    base_url, _ = image_server
+    products = make_products(base_url, ["/products/missing.png"])
+
+    mirror_product_images(products, cache_dir=str(tmp_path))
+
+    assert products[0].local_image_path is None
+
+
+def test_size_cap_evicts_least_recently_used(image_server, tmp_path):
+    base_url, _ = image_server
+    first = make_products(base_url, ["/products/1_front.png"])
+    second = make_products(base_url, ["/products/2_front.png"])
+    cap = len(IMAGES["/products/2_front.png"])
+
+    mirror_product_images(first, cache_dir=str(tmp_path), max_bytes=cap)
+    first_path = first[0].local_image_path
+    mirror_product_images(second, cache_dir=str(tmp_path), max_bytes=cap)
+
+    index = load_index(str(tmp_path))
+    assert list(index.urls) == [second[0].small_url]
+    assert not os.path.exists(first_path)
+    assert os.path.exists(second[0].local_image_path)
+
+
+def test_images_are_handed_over_as_they_arrive(image_server):
+    base_url, requests_seen = image_server
+    urls = [f"{base_url}/products/1_front.png", f"{base_url}/products/2_front.png"]
+    requests_before_each_image = []
+
+    def on_image(url, content):
+        requests_before_each_image.append(len(requests_seen))
+
+    asyncio.run(download_images(urls, 1, on_image))
+
+    # With one connection, the first image is stored before the second is even requested.
+    assert requests_before_each_image == [1, 2]
+
+
+def test_size_cap_holds_during_a_first_run(image_server, tmp_path, mocker):
+    base_url, _ = image_server
+    products = make_products(base_url, ["/products/1_front.png", "/products/2_front.png"])
+    cap = max(len(IMAGES["/products/1_front.png"]), len(IMAGES["/products/2_front.png"]))
+
+    def cache_bytes():
+        return sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(tmp_path)
+            for name in names
+        )
+
+    sizes_on_disk = []
+    real_store_image = image_cache.store_image
+
+    def recording_store_image(*args):
+        sizes_on_disk.append(cache_bytes())
+        return real_store_image(*args)
+
+    mocker.patch("modules.image_cache.store_image", side_effect=recording_store_image)
+
+    mirror_product_images(products, cache_dir=str(tmp_path), max_bytes=cap, max_connections=1)
+
+    assert len(sizes_on_disk) == 2
+    assert max(sizes_on_disk) <= cap
+    assert len(load_index(str(tmp_path)).images) == 1
+    assert sum(product.local_image_path is not None for product in products) == 1
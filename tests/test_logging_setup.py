@@ -0,0 +1,87 @@
+import io
+import logging
+
+import pytest
+
+from modules.data_pipeline import add_price_if_unique
+from modules.records import PriceRecord, ProductRecord
+from modules.logging_setup import (
+    DebugSampler,
+    StageCounters,
+    configure_logging,
+    shutdown_logging,
+)
+
+
+@pytest.fixture
+def restore_root_logger():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+
+    yield
+
+    shutdown_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def make_record(level):
+    return logging.LogRecord("test", level, __file__, 1, "message", None, None)
+
+
+def test_stage_counters_summary():
+    counters = StageCounters("load")
+    counters.incr("inserted")
+    counters.incr("inserted")
+    counters.incr("updated", 5)
+
+    assert counters["inserted"] == 2
+    assert counters.summary() == "load: inserted=2, updated=5"
+    assert StageCounters("fetch").summary() == "fetch: nothing to report"
+
+
+def test_debug_sampler_keeps_one_in_n_debug_records():
+    sampler = DebugSampler(0.25)
+
+    kept = [sampler.filter(make_record(logging.DEBUG)) for _ in range(8)]
+
+    assert kept == [True, False, False, False, True, False, False, False]
+    assert sampler.filter(make_record(logging.INFO))
+    assert not DebugSampler(0).filter(make_record(logging.DEBUG))
+
+
+def test_configure_logging_writes_from_background_listener(restore_root_logger):
+    stream = io.StringIO()
+    configure_logging(logging.DEBUG, debug_sample_rate=0.5, stream=stream)
+
+    for number in range(4):
+        logging.debug(f"debug {number}")
+    logging.info("summary line")
+    shutdown_logging()
+
+    lines = stream.getvalue().splitlines()
+    assert [line.rsplit(" - ", 1)[1] for line in lines] == ["debug 0", "debug 2", "summary line"]
+    assert " - INFO - " in lines[-1]
+
+
+class UnformattableId(str):
+    def __str__(self):
+        raise AssertionError("formatted a DEBUG message while DEBUG is disabled")
+
+    def __format__(self, format_spec):
+        return str(self)
+
+
+def test_hot_loop_debug_messages_are_not_formatted_above_debug(restore_root_logger):
+    logging.getLogger().setLevel(logging.INFO)
+    product_id = UnformattableId("20091825001_EA")
+    price = PriceRecord(store="loblaws", price_cents=100, package_sizing="1ea")
+    combined_data = {
+        product_id: ProductRecord(product_id=product_id, small_url="", title="Cilantro", type="SOLD_BY_EACH")
+    }
+
+    assert add_price_if_unique(combined_data, product_id, price)
+    assert not add_price_if_unique(combined_data, product_id, price)
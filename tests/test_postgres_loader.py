@@ -0,0 +1,156 @@
+import os
+
+import pytest
+
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from database import schema
+from database.schema import ProductComparison, ProductInfo, ProductPrice
+from database.postgres_loader import bulk_load_products
+from database.read_service import cheapest_store, invalidate_cache, search_products
+from database.watchlist import PriceChange
+from modules.logging_setup import StageCounters
+from tests.helpers import load_snapshot, product_record, snapshot_product
+
+
+# e.g. TEST_DATABASE_URL=postgresql://postgres@127.0.0.1:5432/scraper_test
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+requires_postgres = pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set to a PostgreSQL database"
+)
+
+
+@pytest.fixture
+def pg_engine(monkeypatch):
+    test_engine = create_engine(schema.normalize_database_url(TEST_DATABASE_URL))
+    SQLModel.metadata.drop_all(test_engine)
+    schema.init_db(test_engine)
+    monkeypatch.setattr(schema, "_engine", test_engine)
+    invalidate_cache()
+
+    yield test_engine
+
+    invalidate_cache()
+    SQLModel.metadata.drop_all(test_engine)
+    test_engine.dispose()
+
+
+def prices(engine):
+    with Session(engine) as session:
+        return {
+            (row.product_id, row.store): row.price_cents
+            for row in session.exec(select(ProductPrice))
+        }
+
+
+def test_normalize_database_url_selects_psycopg_for_postgres():
+    assert schema.normalize_database_url("postgresql://u@h/db") == "postgresql+psycopg://u@h/db"
+    assert schema.normalize_database_url("postgres://u@h/db") == "postgresql+psycopg://u@h/db"
+    assert schema.normalize_database_url("sqlite:///database.db") == "sqlite:///database.db"
+
+
+def test_configure_engine_switches_the_shared_engine(monkeypatch, tmp_path):
+    monkeypatch.setattr(schema, "_engine", None)
+    monkeypatch.setattr(schema, "DATABASE_URL", schema.DEFAULT_DATABASE_URL)
+
+    schema.configure_engine(f"sqlite:///{tmp_path / 'other.db'}")
+    engine = schema.get_engine()
+
+    assert engine.url.database == str(tmp_path / "other.db")
+    assert (tmp_path / "other.db").exists()
+    schema.configure_engine(schema.DEFAULT_DATABASE_URL)
+
+
+@requires_postgres
+def test_bulk_load_inserts_then_merges_changed_prices(pg_engine):
+    counters = StageCounters("load")
+    changed = bulk_load_products(
+        pg_engine,
+        [
+            product_record("a", [("loblaws", 100), ("nofrills", 129)], local_image_path="a.png"),
+            product_record("b", [("loblaws", 79)]),
+        ],
+        counters,
+    )
+
+    assert sorted(changed) == ["a", "b"]
+    assert counters["inserted"] == 2
+
+    counters = StageCounters("load")
+    changed = bulk_load_products(
+        pg_engine,
+        [
+            product_record("a", [("loblaws", 100), ("nofrills", 119)], title="Fresh Cilantro"),
+            product_record("b", [("loblaws", 79)]),
+        ],
+        counters,
+    )
+
+    assert changed == ["a"]
+    assert counters["updated"] == 2
+    assert prices(pg_engine) == {("a", "loblaws"): 100, ("a", "nofrills"): 119, ("b", "loblaws"): 79}
+
+    with Session(pg_engine) as session:
+        info = session.get(ProductInfo, "a")
+        assert info.title_name == "Fresh Cilantro"
+        assert info.local_image_path == "a.png"
+
+
+@requires_postgres
+def test_bulk_load_keeps_last_duplicate_like_the_row_loader(pg_engine):
+    bulk_load_products(
+        pg_engine,
+        [product_record("a", [("loblaws", 100), ("loblaws", 90)]), product_record("a", [("zehrs", 80)])],
+    )
+
+    assert prices(pg_engine) == {("a", "loblaws"): 90, ("a", "zehrs"): 80}
+
+
+@requires_postgres
+def test_bulk_load_rolls_back_on_error(pg_engine):
+    bulk_load_products(pg_engine, [product_record("a", [("loblaws", 100)])])
+
+    broken = product_record("b", [("loblaws", 50)])
+    broken.small_url = None
+    counters = StageCounters("load")
+    changed = bulk_load_products(pg_engine, [product_record("a", [("loblaws", 1)]), broken], counters)
+
+    assert changed == []
+    assert counters["failed"] == 2
+    assert prices(pg_engine) == {("a", "loblaws"): 100}
+
+
+@requires_postgres
+def test_loader_uses_bulk_path_and_refreshes_read_service(pg_engine, tmp_path):
+    load_snapshot(
+        tmp_path,
+        [
+            snapshot_product(
+                "20091825001_EA", [("loblaws", 100), ("zehrs", 89)], brand="PC", title="Cilantro"
+            )
+        ],
+    )
+
+    assert cheapest_store("20091825001_EA")["store"] == "zehrs"
+    assert search_products(brand="pc")[0]["productId"] == "20091825001_EA"
+    with Session(pg_engine) as session:
+        comparison = session.get(ProductComparison, "20091825001_EA")
+        assert comparison.spread_cents == 11
+
+
+@requires_postgres
+def test_bulk_load_reports_changed_price_rows(pg_engine):
+    bulk_load_products(pg_engine, [product_record("a", [("loblaws", 100), ("nofrills", 129)])])
+
+    price_changes = []
+    bulk_load_products(
+        pg_engine,
+        [product_record("a", [("loblaws", 100), ("nofrills", 119), ("zehrs", 99)])],
+        price_changes=price_changes,
+    )
+
+    assert price_changes == [
+        PriceChange("a", "nofrills", 129, 119),
+        PriceChange("a", "zehrs", None, 99),
+    ]
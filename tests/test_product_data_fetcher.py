@@ -0,0 +1,260 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from modules import product_data_fetcher
+from modules.product_data_fetcher import build_payload, fetch_response, is_truncated, parse_payload
+
+
+DOMAIN = "loblaws"
+
+PAYLOAD = (
+    '{"cart":{"cartId":"TEST_DATA"},"listingInfo":{"filters":{},"sort":{},'
+    '"pagination":{"from":1},"includeFiltersInResponse":true},"banner":"loblaw"}'
+)
+
+
+def listing_response(status_code, product_grid):
+    body = json.dumps(
+        {
+            "layout": {
+                "sections": {
+                    "productListingSection": {"components": [{"data": {"productGrid": product_grid}}]}
+                }
+            }
+        }
+    )
+    return SimpleNamespace(status_code=status_code, text=body, content=body.encode("utf-8"))
+
+
+class FakeListingApi:
+    """Serves a catalog of `total` products, like the listing endpoint does.
+
+    Page sizes above `max_size` are rejected with a 400, or silently capped when `cap` is set.
+    `fail_once` lists (page number, page size) pairs that are rejected the first time they're asked for.
+    Requests without the current `x-apikey` header get a 403.
+    """
+
+    def __init__(self, total, max_size, cap=False, report_total=True, fail_once=()):
+        self.total = total
+        self.max_size = max_size
+        self.cap = cap
+        self.report_total = report_total
+        self.fail_once = set(fail_once)
+        self.requests = []
+        self.api_key = "TEST_DATA"
+        self.cart_ids = []
+
+    def __call__(self, method, url, headers, data, impersonate):
+        if headers.get("x-apikey") != self.api_key:
+            return listing_response(403, None)
+
+        payload = json.loads(data)
+        pagination = payload["listingInfo"]["pagination"]
+        page_number, page_size = pagination["from"], pagination.get("size", 48)
+        self.requests.append((page_number, page_size))
+        self.cart_ids.append(payload["cart"]["cartId"])
+
+        if (page_number, page_size) in self.fail_once:
+            self.fail_once.discard((page_number, page_size))
+            return listing_response(400, None)
+        if page_size > self.max_size and not self.cap:
+            return listing_response(400, None)
+
+        served_size = min(page_size, self.max_size)
+        start = (page_number - 1) * page_size
+        tiles = [{"productId": str(number)} for number in range(start, min(start + served_size, self.total))]
+        if not tiles:
+            return listing_response(200, None)
+
+        product_grid = {"productTiles": tiles}
+        if self.report_total:
+            product_grid["pagination"] = {"totalResults": self.total}
+        return listing_response(200, product_grid)
+
+
+@pytest.fixture
+def run_fetch(tmp_path, monkeypatch, mocker):
+    monkeypatch.chdir(tmp_path)
+    mocker.patch.object(product_data_fetcher.time, "sleep")
+
+    def run(api, page_sizes=(500, 250, 100, 48), recapture=None):
+        mocker.patch.object(product_data_fetcher.cr, "request", side_effect=api)
+        fetch_response(
+            "POST", "https://api.example", {"x-apikey": "TEST_DATA"}, PAYLOAD, DOMAIN, page_sizes, recapture
+        )
+
+        folder = tmp_path / "raw_product_data" / f"{DOMAIN}_raw_product_data"
+        product_ids = set()
+        for page in folder.iterdir():
+            product_grid = product_data_fetcher.get_product_grid(json.loads(page.read_text()))
+            product_ids.update(tile["productId"] for tile in (product_grid or {}).get("productTiles", []))
+        return product_ids
+
+    return run
+
+
+def test_build_payload_sets_page_and_size_without_touching_the_template():
+    template = parse_payload(PAYLOAD)
+    payload = json.loads(build_payload(template, 3, 250))
+
+    assert payload["listingInfo"]["pagination"] == {"from": 3, "size": 250}
+    assert payload["listingInfo"]["includeFiltersInResponse"] is True
+    assert template["listingInfo"]["pagination"] == {"from": 1}
+    assert "size" not in json.loads(build_payload(template, 2))["listingInfo"]["pagination"]
+
+
+def test_is_truncated_uses_the_reported_total():
+    short_page = {"productTiles": [{}] * 10, "pagination": {"totalResults": 120}}
+
+    assert is_truncated(short_page, 1, 100)
+    assert not is_truncated(short_page, 2, 110)
+    assert not is_truncated({"productTiles": [{}] * 10}, 1, 100)
+
+
+def test_probes_the_largest_accepted_size_and_reuses_the_probe_page(run_fetch):
+    api = FakeListingApi(total=1000, max_size=250)
+
+    assert run_fetch(api) == {str(number) for number in range(1000)}
+    # One rejected probe, then pages 1..4 at 250 and three empty pages.
+    assert api.requests[0] == (1, 500)
+    assert api.requests[1:] == [(page, 250) for page in range(1, 8)]
+
+
+def test_silently_capped_sizes_are_not_used(run_fetch):
+    api = FakeListingApi(total=1000, max_size=100, cap=True)
+
+    assert run_fetch(api) == {str(number) for number in range(1000)}
+    assert {size for _, size in api.requests[2:]} == {100}
+
+
+def test_falls_back_to_a_smaller_size_when_a_page_is_rejected(run_fetch):
+    api = FakeListingApi(total=1000, max_size=500, fail_once=[(2, 500)])
+
+    assert run_fetch(api) == {str(number) for number in range(1000)}
+    # Page 2 at 500 starts at product 500, which is page 3 at 250.
+    assert api.requests[:4] == [(1, 500), (2, 500), (3, 250), (4, 250)]
+
+
+def test_keeps_the_captured_page_size_when_no_candidate_is_trusted(run_fetch):
+    api = FakeListingApi(total=300, max_size=100, cap=True, report_total=False)
+
+    assert run_fetch(api, page_sizes=(500, 250)) == {str(number) for number in range(300)}
+    assert api.requests[2:5] == [(1, 48), (2, 48), (3, 48)]
+
+
+def recapture_for(api, api_key):
+    def recapture(domain, timeout=None):
+        return {
+            "method": "POST",
+            "url": "https://api.example",
+            "headers": {"x-apikey": api_key},
+            "payload": PAYLOAD.replace("TEST_DATA", "FRESH_CART"),
+            "domain": domain,
+        }
+
+    return recapture
+
+
+class ExpiringListingApi(FakeListingApi):
+    """Rotates its API key once `expire_after` pages have been served."""
+
+    def __init__(self, expire_after, **kwargs):
+        super().__init__(**kwargs)
+        self.expire_after = expire_after
+
+    def __call__(self, method, url, headers, data, impersonate):
+        if len(self.requests) == self.expire_after:
+            self.api_key = "ROTATED"
+        return super().__call__(method, url, headers, data, impersonate)
+
+
+def test_refreshes_expired_headers_and_resumes_from_the_failed_page(run_fetch, tmp_path):
+    api = ExpiringListingApi(expire_after=3, total=1000, max_size=100)
+    recaptured_domains = []
+
+    def recapture(domain, timeout):
+        recaptured_domains.append((domain, timeout))
+        return recapture_for(api, "ROTATED")(domain)
+
+    assert run_fetch(api, page_sizes=(100,), recapture=recapture) == {str(number) for number in range(1000)}
+    assert recaptured_domains == [(DOMAIN, product_data_fetcher.REFRESH_TIMEOUT_SECONDS)]
+    # Page 4 failed with the old key and was retried with the fresh one.
+    assert api.requests[3] == (4, 100)
+    assert api.cart_ids[:3] == ["TEST_DATA"] * 3
+    assert set(api.cart_ids[3:]) == {"FRESH_CART"}
+
+    folder = tmp_path / "raw_product_data" / f"{DOMAIN}_raw_product_data"
+    assert len(list(folder.iterdir())) == 13
+
+
+def test_stops_without_saving_forbidden_pages_when_refresh_fails(run_fetch, tmp_path, caplog):
+    api = ExpiringListingApi(expire_after=2, total=1000, max_size=100)
+
+    def recapture(domain, timeout):
+        raise RuntimeError("browser crashed")
+
+    assert run_fetch(api, page_sizes=(100,), recapture=recapture) == {str(number) for number in range(200)}
+
+    folder = tmp_path / "raw_product_data" / f"{DOMAIN}_raw_product_data"
+    assert sorted(page.name for page in folder.iterdir()) == [
+        f"{DOMAIN}_raw_product_data_1.json",
+        f"{DOMAIN}_raw_product_data_2.json",
+    ]
+    assert "Pages from 3 on were not fetched" in caplog.text
+
+
+def test_gives_up_after_repeated_auth_failures(run_fetch):
+    api = ExpiringListingApi(expire_after=0, total=100, max_size=100)
+    attempts = []
+
+    def recapture(domain, timeout):
+        attempts.append(domain)
+        return recapture_for(api, "STILL_WRONG")(domain)
+
+    assert run_fetch(api, page_sizes=(100,), recapture=recapture) == set()
+    assert len(attempts) == product_data_fetcher.MAX_HEADER_REFRESHES
+
+
+def test_refresh_gives_up_on_a_recapture_that_overruns_its_timeout():
+    release = threading.Event()
+    timeouts = []
+
+    def recapture(domain, timeout):
+        timeouts.append(timeout)
+        release.wait(5)
+        return recapture_for(None, "LATE")(domain)
+
+    try:
+        assert product_data_fetcher.refresh_request(DOMAIN, recapture, timeout=0.05) is None
+        (thread,) = [thread for thread in threading.enumerate() if thread.name == f"refresh-{DOMAIN}"]
+        # A daemon thread can't hold up interpreter exit while the browser winds down.
+        assert thread.daemon
+        assert timeouts == [0.05]
+    finally:
+        release.set()
+    thread.join(5)
+
+
+def test_a_recaptured_request_without_payload_is_a_failed_refresh(caplog):
+    session = product_data_fetcher.ListingSession(
+        "POST",
+        "https://api.example",
+        {"x-apikey": "TEST_DATA"},
+        PAYLOAD,
+        DOMAIN,
+        recapture=lambda domain, timeout: {
+            "method": "GET",
+            "url": "https://api.example",
+            "headers": {"x-apikey": "FRESH"},
+            "payload": None,
+            "domain": domain,
+        },
+    )
+
+    assert not session.refresh()
+    assert session.headers == {"x-apikey": "TEST_DATA"}
+    assert session.method == "POST"
+    assert "has no payload" in caplog.text
@@ -0,0 +1,233 @@
+import os
+import sys
+import json
+import time
+import socket
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+
+import pytest
+from pathlib import Path
+from http.server import ThreadingHTTPServer
+from sqlalchemy import text
+from sqlmodel import Session, create_engine
+
+from database import read_service, schema
+from database.read_service import (
+    SEARCH_QUERIES,
+    ReadServiceHandler,
+    brand_parameters,
+    bump_data_version,
+    cheapest_store,
+    data_version,
+    price_spread,
+    search_products,
+)
+from tests.helpers import load_snapshot, snapshot_product
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+PRODUCTS = [
+    snapshot_product(
+        "20091825001_EA",
+        [
+            ("loblaws", 100, "1 bunch, $1.00/1ea"),
+            ("nofrills", 129, "1 bunch, $1.29/1ea"),
+            ("zehrs", 89, "1 bunch, $0.89/1ea"),
+        ],
+        title="Cilantro",
+    ),
+    snapshot_product(
+        "20143381001_KG",
+        [("loblaws", 79, "$6.61/1kg $3.00/1lb")],
+        brand="PC Organics",
+        title="Roma Tomatoes",
+        product_type="SOLD_BY_EACH_PRICED_BY_WEIGHT",
+    ),
+]
+
+
+@pytest.fixture
+def loaded(engine, tmp_path):
+    return load_snapshot(tmp_path, PRODUCTS)
+
+
+def test_cheapest_store(loaded):
+    assert cheapest_store("20091825001_EA") == {
+        "productId": "20091825001_EA",
+        "store": "zehrs",
+        "price_cents": 89,
+        "packageSizing": "1 bunch, $0.89/1ea",
+    }
+    assert cheapest_store("unknown") is None
+
+
+def test_price_spread(loaded):
+    spread = price_spread("20091825001_EA")
+
+    assert spread["min_price_cents"] == 89
+    assert spread["max_price_cents"] == 129
+    assert spread["spread_cents"] == 40
+    assert [price["store"] for price in spread["prices"]] == ["zehrs", "loblaws", "nofrills"]
+
+
+def test_search_by_brand_and_type(loaded):
+    assert [product["productId"] for product in search_products(brand="pc")] == ["20143381001_KG"]
+    assert [product["productId"] for product in search_products(product_type="SOLD_BY_EACH")] == ["20091825001_EA"]
+    assert len(search_products()) == 2
+
+
+def test_search_matches_brand_prefix_case_insensitively(loaded):
+    assert [product["productId"] for product in search_products(brand="PC ORG")] == ["20143381001_KG"]
+    assert search_products(brand="organics") == []
+    assert search_products(brand="pc_") == []
+    assert search_products(brand="pc", product_type="SOLD_BY_EACH") == []
+
+
+@pytest.mark.parametrize(
+    "filters, index",
+    [
+        ((True, False), "ix_productinfo_brand_name_lower"),
+        ((False, True), "ix_productinfo_type_product_id"),
+    ],
+)
+def test_search_queries_use_the_indexes(engine, filters, index):
+    parameters = {"limit": 10, "product_type": "SOLD_BY_EACH", **brand_parameters("pc")}
+
+    with engine.connect() as connection:
+        plan = connection.execute(
+            text(f"EXPLAIN QUERY PLAN {SEARCH_QUERIES[filters].text}"), parameters
+        ).all()
+
+    assert any(index in row[-1] for row in plan)
+
+
+def test_loader_invalidates_cache(loaded, tmp_path):
+    assert cheapest_store("20091825001_EA")["store"] == "zehrs"
+
+    updated = json.loads(loaded.read_text())
+    updated[0]["prices"][2]["price_cents"] = 150
+    load_snapshot(tmp_path, updated)
+
+    assert cheapest_store("20091825001_EA")["store"] == "loblaws"
+
+
+def test_http_endpoint(loaded):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ReadServiceHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    try:
+        with urllib.request.urlopen(f"{base_url}/products/20091825001_EA/cheapest") as response:
+            assert json.loads(response.read())["store"] == "zehrs"
+
+        with urllib.request.urlopen(f"{base_url}/products?brand=PC%20Org") as response:
+            assert [product["title"] for product in json.loads(response.read())] == ["Roma Tomatoes"]
+
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{base_url}/products/unknown/spread")
+        assert error.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_bump_data_version_creates_then_increments_the_row(engine):
+    assert data_version() == 0
+
+    for _ in range(2):
+        with Session(engine) as session:
+            bump_data_version(session)
+            session.commit()
+
+    assert data_version() == 2
+
+
+def test_cache_is_dropped_when_another_process_bumps_the_version(loaded, monkeypatch):
+    monkeypatch.setattr(read_service, "VERSION_CHECK_INTERVAL_SECONDS", 0.2)
+    assert cheapest_store("20091825001_EA")["store"] == "zehrs"
+
+    # Another process loads directly, so this process' loader never runs invalidate_cache.
+    with Session(schema.get_engine()) as session:
+        session.execute(text("UPDATE productprice SET price_cents = 150 WHERE store = 'zehrs'"))
+        bump_data_version(session)
+        session.commit()
+
+    # Within the interval the cached answer is served without reading the version.
+    assert cheapest_store("20091825001_EA")["store"] == "zehrs"
+
+    time.sleep(0.25)
+    assert cheapest_store("20091825001_EA")["store"] == "loblaws"
+
+
+def test_cache_hits_within_the_interval_do_not_query_the_version(loaded, mocker):
+    cheapest_store("20091825001_EA")
+    data_version = mocker.spy(read_service, "data_version")
+
+    for _ in range(100):
+        cheapest_store("20091825001_EA")
+
+    data_version.assert_not_called()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get_json(url, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(url) as response:
+                return json.loads(response.read())
+        except urllib.error.URLError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def wait_for_store(url, store, timeout=10):
+    deadline = time.monotonic() + timeout
+    while (current := get_json(url)["store"]) != store and time.monotonic() < deadline:
+        time.sleep(0.1)
+    return current
+
+
+def test_load_in_this_process_refreshes_a_separately_started_server(tmp_path, monkeypatch):
+    database_url = f"sqlite:///{tmp_path / 'shared.db'}"
+    monkeypatch.setattr(schema, "_engine", create_engine(database_url))
+    schema.init_db(schema._engine)
+
+    snapshot = load_snapshot(tmp_path, PRODUCTS)
+
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            f"from database.read_service import serve; serve(port={port})",
+        ],
+        cwd=REPO_ROOT,
+        env={**os.environ, "DATABASE_URL": database_url, "PYTHONPATH": str(REPO_ROOT)},
+    )
+    url = f"http://127.0.0.1:{port}/products/20091825001_EA/cheapest"
+
+    try:
+        assert get_json(url)["store"] == "zehrs"
+
+        updated = json.loads(snapshot.read_text())
+        updated[0]["prices"][2]["price_cents"] = 150
+        load_snapshot(tmp_path, updated)
+
+        # The server notices the new version within its check interval.
+        assert wait_for_store(url, "loblaws") == "loblaws"
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+        schema._engine.dispose()
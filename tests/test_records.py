@@ -0,0 +1,138 @@
+import gc
+import json
+import tracemalloc
+
+import msgspec
+
+from modules.data_pipeline import convert_and_combine, extract_product_info
+from modules.records import PriceRecord, ProductRecord, decode_products, encode_products
+
+
+DOMAINS = ["loblaws", "nofrills", "zehrs"]
+PRODUCT_COUNT = 3000
+
+# Retained bytes per combined product with three store prices. Most of it is the product's
+# own strings (id, URL, title, package sizing); nested dicts need about twice as much.
+BYTES_PER_PRODUCT_BUDGET = 1000
+
+
+def make_tile(number, domain_offset):
+    return {
+        "productId": f"{20000000000 + number}_EA",
+        "productImage": [{"smallUrl": f"https://assets.shop.loblaws.ca/products/{number}/front.png"}],
+        "brand": f"Brand {number % 40}",
+        "title": f"Product number {number}",
+        "pricing": {"price": f"{1 + number % 20}.{domain_offset}9"},
+        "pricingUnits": {"type": "SOLD_BY_EACH"},
+        "packageSizing": f"{number % 12 + 1} ea, ${number % 7}.00/1ea",
+    }
+
+
+def write_consolidated_files(directory):
+    folder = directory / "consolidated_product_data"
+    folder.mkdir()
+    for offset, domain in enumerate(DOMAINS):
+        tiles = [make_tile(number, offset) for number in range(PRODUCT_COUNT)]
+        (folder / f"{domain}_consolidated_product_data.json").write_text(json.dumps(tiles))
+
+
+def retained_bytes(build):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def test_records_round_trip_to_snapshot_format():
+    product = ProductRecord(
+        product_id="20091825001_EA",
+        small_url="//assets.shop.loblaws.ca/products/20091825001.png",
+        title="Cilantro",
+        type="SOLD_BY_EACH",
+        prices=[PriceRecord(store="loblaws", price_cents=100, package_sizing="1 bunch")],
+    )
+
+    encoded = encode_products([product])
+
+    assert json.loads(encoded)[0]["prices"] == [
+        {"store": "loblaws", "price_cents": 100, "packageSizing": "1 bunch"}
+    ]
+    assert decode_products(encoded) == [product]
+
+
+def test_decoded_records_share_interned_strings():
+    data = encode_products(
+        [
+            ProductRecord(
+                product_id=f"product_{number}",
+                small_url="",
+                brand="PC",
+                title="",
+                type="SOLD_BY_EACH",
+                prices=[PriceRecord(store="loblaws", price_cents=number, package_sizing="")],
+            )
+            for number in range(2)
+        ]
+    )
+
+    first, second = decode_products(data)
+
+    assert first.type is second.type
+    assert first.brand is second.brand
+    assert first.prices[0].store is second.prices[0].store
+
+
+def test_null_strings_from_the_api_become_empty_strings():
+    tile = dict(make_tile(1, 0), title=None, packageSizing=None, pricingUnits=None)
+
+    product = extract_product_info(tile, "loblaws")
+
+    assert product.title == ""
+    assert product.type == ""
+    assert product.prices[0].package_sizing == ""
+    assert decode_products(encode_products([product])) == [product]
+
+
+def test_a_record_with_a_null_title_is_skipped_not_the_snapshot(caplog):
+    good, bad = (
+        {
+            "productId": f"2009182500{number}_EA",
+            "smallUrl": "//assets.shop.loblaws.ca/products/20091825001.png",
+            "title": "Cilantro",
+            "type": "SOLD_BY_EACH",
+            "prices": [{"store": "loblaws", "price_cents": 100, "packageSizing": "1 bunch"}],
+        }
+        for number in range(2)
+    )
+    bad["title"] = None
+
+    products = decode_products(json.dumps([good, bad]).encode())
+
+    assert [product.product_id for product in products] == ["20091825000_EA"]
+    assert "Skipping product 1" in caplog.text
+
+
+def test_memory_per_product(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_consolidated_files(tmp_path)
+
+    combined, combined_bytes = retained_bytes(lambda: convert_and_combine(DOMAINS))
+    snapshot = encode_products(combined)
+    _, dict_bytes = retained_bytes(lambda: msgspec.json.decode(snapshot))
+    _, record_bytes = retained_bytes(lambda: decode_products(snapshot))
+
+    per_product = {
+        "convert_and_combine": combined_bytes / len(combined),
+        "decoded records": record_bytes / len(combined),
+        "decoded dicts": dict_bytes / len(combined),
+    }
+    report = ", ".join(f"{name}: {size:.0f} B/product" for name, size in per_product.items())
+
+    assert len(combined) == PRODUCT_COUNT
+    assert per_product["convert_and_combine"] < BYTES_PER_PRODUCT_BUDGET, report
+    assert per_product["decoded records"] < BYTES_PER_PRODUCT_BUDGET, report
+    assert per_product["decoded records"] < per_product["decoded dicts"] / 2, report
@@ -0,0 +1,123 @@
+import os
+
+import pytest
+
+import main
+from modules.records import PriceRecord, ProductRecord
+from modules.snapshot_io import read_snapshot, write_snapshot
+from database.run_catalog import (
+    apply_retention,
+    get_run,
+    latest_run,
+    list_runs,
+    record_run,
+    verify_run,
+)
+
+
+PRODUCTS = [
+    ProductRecord(
+        product_id="20091825001_EA",
+        small_url="//assets.shop.loblaws.ca/products/20091825001.png",
+        title="Cilantro",
+        type="SOLD_BY_EACH",
+        prices=[
+            PriceRecord(store="loblaws", price_cents=100, package_sizing="1 bunch"),
+            PriceRecord(store="zehrs", price_cents=89, package_sizing="1 bunch"),
+        ],
+    )
+]
+
+
+def write_runs(tmp_path, count):
+    runs = []
+    for number in range(count):
+        path = str(tmp_path / f"combined_product_data_2024_01_0{number + 1}_00_00.json")
+        write_snapshot(PRODUCTS, path)
+        runs.append(record_run(path, "json", ["loblaws", "zehrs"], PRODUCTS))
+    return runs
+
+
+def test_record_and_look_up_runs(engine, tmp_path):
+    first, second = write_runs(tmp_path, 2)
+
+    assert latest_run().id == second.id
+    assert get_run(first.id).path == first.path
+    assert [run.id for run in list_runs()] == [second.id, first.id]
+    assert second.product_count == 1
+    assert second.price_count == 2
+    assert second.domains == "loblaws,zehrs"
+    assert verify_run(second)
+
+
+def test_rerecording_a_path_updates_the_same_run(engine, tmp_path):
+    (run,) = write_runs(tmp_path, 1)
+
+    again = record_run(run.path, "json", ["loblaws"], PRODUCTS)
+
+    assert again.id == run.id
+    assert len(list_runs()) == 1
+
+
+def test_verify_detects_modified_snapshot(engine, tmp_path):
+    (run,) = write_runs(tmp_path, 1)
+
+    with open(run.path, "ab") as file:
+        file.write(b" ")
+
+    assert not verify_run(run)
+
+
+def test_retention_deletes_and_compacts_old_runs(engine, tmp_path):
+    runs = write_runs(tmp_path, 4)
+
+    apply_retention(keep_last=3, compact_after=1, compact_format="ndjson.zst")
+
+    remaining = list_runs()
+    assert [run.id for run in remaining] == [runs[3].id, runs[2].id, runs[1].id]
+    assert not os.path.exists(runs[0].path)
+
+    assert remaining[0].snapshot_format == "json"
+    for run in remaining[1:]:
+        assert run.snapshot_format == "ndjson.zst"
+        assert run.path.endswith(".ndjson.zst")
+        assert verify_run(run)
+        assert read_snapshot(run.path) == PRODUCTS
+
+
+@pytest.mark.parametrize("keep_last", [0, -1])
+def test_retention_keeps_at_least_one_run(engine, tmp_path, keep_last):
+    runs = write_runs(tmp_path, 2)
+
+    with pytest.raises(ValueError):
+        apply_retention(keep_last=keep_last)
+    with pytest.raises(SystemExit):
+        main.build_parser().parse_args(["prune", "-keep", str(keep_last)])
+
+    assert len(list_runs()) == 2
+    assert all(os.path.exists(run.path) for run in runs)
+
+
+def test_retention_keeps_files_when_the_commit_fails(engine, tmp_path, mocker):
+    runs = write_runs(tmp_path, 3)
+    mocker.patch("database.run_catalog.Session.commit", side_effect=RuntimeError("disk full"))
+
+    with pytest.raises(RuntimeError):
+        apply_retention(keep_last=1, compact_after=0, compact_format="ndjson.zst")
+
+    assert all(os.path.exists(run.path) for run in runs)
+    assert [run.path for run in list_runs()] == [run.path for run in reversed(runs)]
+
+
+def test_latest_file_comes_from_the_catalog(engine, tmp_path):
+    first, second = write_runs(tmp_path, 2)
+    os.utime(first.path, (4102444800, 4102444800))
+
+    assert main.get_latest_combined_data_file(str(tmp_path)) == second.path
+
+
+def test_latest_file_falls_back_to_file_name_timestamps(engine, tmp_path):
+    for day in (2, 1):
+        write_snapshot(PRODUCTS, str(tmp_path / f"combined_product_data_2024_01_0{day}_00_00.json"))
+
+    assert main.get_latest_combined_data_file(str(tmp_path)).endswith("2024_01_02_00_00.json")
@@ -0,0 +1,134 @@
+import json
+
+import msgspec
+import pytest
+
+import main
+from modules import snapshot_io
+from modules.records import PriceRecord, ProductRecord
+from modules.snapshot_io import (
+    SNAPSHOT_FORMATS,
+    SnapshotFormat,
+    decode_snapshot,
+    detect_format,
+    encode_snapshot,
+    format_from_path,
+    read_snapshot,
+    write_snapshot,
+)
+
+
+PRODUCTS = [
+    ProductRecord(
+        product_id="20091825001_EA",
+        small_url="//assets.shop.loblaws.ca/products/20091825001.png",
+        title="Cilantro",
+        type="SOLD_BY_EACH",
+        prices=[
+            PriceRecord(store="loblaws", price_cents=100, package_sizing="1 bunch, $1.00/1ea"),
+            PriceRecord(store="nofrills", price_cents=129, package_sizing="1 bunch, $1.29/1ea"),
+        ],
+    ),
+    ProductRecord(
+        product_id="20143381001_KG",
+        small_url="//assets.shop.loblaws.ca/products/20143381001.png",
+        brand="PC",
+        title="Roma Tomatoes",
+        type="SOLD_BY_EACH_PRICED_BY_WEIGHT",
+        prices=[PriceRecord(store="zehrs", price_cents=79, package_sizing="$6.61/1kg")],
+    ),
+]
+
+
+@pytest.mark.parametrize("snapshot_format", list(SNAPSHOT_FORMATS))
+def test_round_trip(tmp_path, snapshot_format):
+    path = tmp_path / f"snapshot{SNAPSHOT_FORMATS[snapshot_format].extension}"
+
+    assert write_snapshot(PRODUCTS, str(path)) == snapshot_format
+    assert format_from_path(str(path)) == snapshot_format
+    assert read_snapshot(str(path)) == PRODUCTS
+
+
+@pytest.mark.parametrize("snapshot_format", list(SNAPSHOT_FORMATS))
+def test_format_is_detected_from_content(tmp_path, snapshot_format):
+    encoded = encode_snapshot(PRODUCTS, snapshot_format)
+    path = tmp_path / "snapshot.bin"
+    path.write_bytes(encoded)
+
+    assert detect_format(encoded) == snapshot_format
+    assert read_snapshot(str(path)) == PRODUCTS
+
+
+def test_detecting_a_compressed_snapshot_only_decompresses_its_start(mocker):
+    encoded = encode_snapshot(PRODUCTS * 500, "ndjson.zst")
+    decompress = mocker.spy(snapshot_io, "decompress")
+    decompress_head = mocker.spy(snapshot_io, "decompress_head")
+
+    assert detect_format(encoded) == "ndjson.zst"
+    decompress.assert_not_called()
+    assert all(len(call.spy_return) <= snapshot_io.SNIFF_BYTES for call in decompress_head.call_args_list)
+
+
+def test_decode_uses_the_registered_detector(monkeypatch):
+    monkeypatch.setitem(
+        SNAPSHOT_FORMATS,
+        "tagged",
+        SnapshotFormat(
+            ".tagged",
+            lambda products: b"TAG" + encode_snapshot(products),
+            lambda data: decode_snapshot(data[3:]),
+            lambda data: data.startswith(b"TAG"),
+        ),
+    )
+
+    assert detect_format(b"TAG[]") == "tagged"
+    assert decode_snapshot(SNAPSHOT_FORMATS["tagged"].encode(PRODUCTS)) == PRODUCTS
+
+
+def test_empty_and_unrecognized_snapshots():
+    assert decode_snapshot(b"") == []
+    assert decode_snapshot(encode_snapshot([], "ndjson.zst")) == []
+    with pytest.raises(msgspec.DecodeError):
+        decode_snapshot(b"<products/>")
+
+
+def test_ndjson_skips_a_record_with_null_package_sizing(caplog):
+    bad = json.loads(encode_snapshot(PRODUCTS[:1], "json"))[0]
+    bad["prices"][0]["packageSizing"] = None
+    data = encode_snapshot(PRODUCTS[1:], "ndjson") + json.dumps(bad).encode() + b"\n"
+
+    assert decode_snapshot(data) == PRODUCTS[1:]
+    assert "Skipping product 1" in caplog.text
+
+
+def test_reads_legacy_indented_snapshot(tmp_path):
+    path = tmp_path / "combined_product_data_2024_01_01_00_00.json"
+    path.write_text(
+        json.dumps(
+            [
+                {
+                    "productId": "20091825001_EA",
+                    "smallUrl": "//assets.shop.loblaws.ca/products/20091825001.png",
+                    "brand": None,
+                    "title": "Cilantro",
+                    "type": "SOLD_BY_EACH",
+                    "prices": [
+                        {"store": "loblaws", "price_cents": 100, "packageSizing": "1 bunch, $1.00/1ea"},
+                        {"store": "nofrills", "price_cents": 129, "packageSizing": "1 bunch, $1.29/1ea"},
+                    ],
+                }
+            ],
+            indent=4,
+        )
+    )
+
+    assert read_snapshot(str(path)) == PRODUCTS[:1]
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        encode_snapshot(PRODUCTS, "xml")
+
+
+def test_cli_format_choices_match_registry():
+    assert set(main.SNAPSHOT_FORMAT_CHOICES) == set(SNAPSHOT_FORMATS)
@@ -0,0 +1,29 @@
+from benchmarks.synthetic_catalog import generate_catalog
+from modules.data_pipeline import convert_and_combine
+from modules.extract_product_data import extract_product_data_from_files
+
+
+def test_generated_catalog_runs_through_extract_and_transform(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    stats = generate_catalog(str(tmp_path), products=300, banners=3, overlap=0.4, tiles_per_page=25)
+
+    for banner in stats.banners:
+        extract_product_data_from_files(banner, max_workers=1)
+    products = convert_and_combine(stats.banners)
+
+    assert stats.banners == ["loblaws", "nofrills", "zehrs"]
+    assert len(products) == 300
+    # Shared products are listed by all three banners, the rest by one.
+    shared = (stats.listings - stats.products) // 2
+    assert 0.3 * stats.products < shared < 0.5 * stats.products
+    assert sum(len(product.prices) for product in products) <= stats.listings
+    assert max(len(product.prices) for product in products) == 3
+
+
+def test_generated_catalog_is_reproducible(tmp_path):
+    first = generate_catalog(str(tmp_path / "first"), products=100, seed=7)
+    second = generate_catalog(str(tmp_path / "second"), products=100, seed=7)
+
+    page = "raw_product_data/loblaws_raw_product_data/loblaws_raw_product_data_1.json"
+    assert first == second
+    assert (tmp_path / "first" / page).read_bytes() == (tmp_path / "second" / page).read_bytes()
@@ -0,0 +1,109 @@
+import json
+
+from sqlmodel import Session, select
+
+from database.schema import PriceAlert
+from database.watchlist import (
+    PriceChange,
+    add_rule,
+    disable_rule,
+    evaluate_watchlists,
+    list_alerts,
+    list_rules,
+)
+from tests.helpers import load_snapshot, snapshot_product
+
+
+def snapshot(loblaws_cilantro=100, nofrills_cilantro=129, nofrills_cheese=500):
+    return [
+        snapshot_product("cilantro", [("loblaws", loblaws_cilantro), ("nofrills", nofrills_cilantro)]),
+        snapshot_product("cheese", [("nofrills", nofrills_cheese), ("zehrs", 520)], brand="PC"),
+    ]
+
+
+def alerts(engine):
+    with Session(engine) as session:
+        return [
+            (alert.rule_id, alert.product_id, alert.store, alert.old_price_cents, alert.new_price_cents)
+            for alert in session.exec(select(PriceAlert).order_by(PriceAlert.id))
+        ]
+
+
+def test_rules_fire_only_on_matching_changed_prices(engine, tmp_path):
+    load_snapshot(tmp_path, snapshot())
+    below = add_rule(product_id="cilantro", max_price_cents=90)
+    brand_change = add_rule(brand_name="pc", store="nofrills", min_change_percent=10)
+    add_rule(product_type="SOLD_BY_WEIGHT")
+
+    load_snapshot(tmp_path, snapshot(loblaws_cilantro=89, nofrills_cilantro=119, nofrills_cheese=440))
+
+    assert alerts(engine) == [
+        (below.id, "cilantro", "loblaws", 100, 89),
+        (brand_change.id, "cheese", "nofrills", 500, 440),
+    ]
+    assert list_alerts(1)[0].change_percent == -12.0
+
+
+def test_unchanged_load_produces_no_alerts_and_runs_no_queries(engine, tmp_path, mocker):
+    load_snapshot(tmp_path, snapshot())
+    add_rule(store="loblaws")
+
+    load_snapshot(tmp_path, snapshot())
+    assert alerts(engine) == []
+
+    with Session(engine) as session:
+        exec_spy = mocker.spy(session, "exec")
+        assert evaluate_watchlists(session, []) == []
+        exec_spy.assert_not_called()
+
+
+def test_new_prices_fire_threshold_rules_but_not_change_rules(engine, tmp_path):
+    threshold = add_rule(product_id="cheese", max_price_cents=510)
+    add_rule(product_id="cheese", min_change_percent=1)
+
+    load_snapshot(tmp_path, snapshot())
+
+    assert alerts(engine) == [(threshold.id, "cheese", "nofrills", None, 500)]
+
+
+def test_disabled_rules_do_not_fire(engine, tmp_path):
+    load_snapshot(tmp_path, snapshot())
+    rule = add_rule(product_id="cilantro")
+
+    assert disable_rule(rule.id)
+    assert not disable_rule(12345)
+    assert list_rules() == []
+
+    load_snapshot(tmp_path, snapshot(loblaws_cilantro=50))
+    assert alerts(engine) == []
+
+
+def test_alerts_can_go_to_an_ndjson_file(engine, tmp_path):
+    load_snapshot(tmp_path, snapshot())
+    rule = add_rule(store="zehrs")
+    add_rule(product_id="cilantro", max_price_cents=80)
+    alerts_path = tmp_path / "alerts.ndjson"
+
+    load_snapshot(tmp_path, snapshot(loblaws_cilantro=75), str(alerts_path))
+    load_snapshot(tmp_path, snapshot(loblaws_cilantro=70), str(alerts_path))
+
+    lines = [json.loads(line) for line in alerts_path.read_text().splitlines()]
+    assert [(line["product_id"], line["old_price_cents"], line["new_price_cents"]) for line in lines] == [
+        ("cilantro", 100, 75),
+        ("cilantro", 75, 70),
+    ]
+    assert all(line["rule_id"] != rule.id for line in lines)
+    assert alerts(engine) == []
+
+
+def test_evaluate_watchlists_matches_brand_case_insensitively(engine, tmp_path):
+    load_snapshot(tmp_path, snapshot())
+    rule = add_rule(brand_name="pc")
+
+    with Session(engine) as session:
+        fired = evaluate_watchlists(
+            session,
+            [PriceChange("cheese", "zehrs", 520, 500), PriceChange("cilantro", "zehrs", 100, 90)],
+        )
+
+    assert [(alert.rule_id, alert.product_id) for alert in fired] == [(rule.id, "cheese")]
@@ -1,5 +1,5 @@
 import pytest
-from modules.web_request_converter import request_to_curl, curl_to_requests
+from modules.web_request_converter import fetch_request, request_to_curl, curl_to_requests
 
 
 @pytest.fixture
@@ -84,3 +84,17 @@ def test_curl_to_requests(curl_data):
     }
 
     assert testing_request == expected_request
+
+
+def test_fetch_request_closes_the_browser_when_it_times_out(mocker):
+    playwright = mocker.patch("modules.web_request_converter.sync_playwright")
+    browser = playwright.return_value.__enter__.return_value.chromium.launch.return_value
+    page = browser.new_page.return_value
+    page.expect_response.side_effect = TimeoutError("Timeout 5000ms exceeded")
+
+    with pytest.raises(TimeoutError):
+        fetch_request("loblaws", timeout=5)
+
+    page.set_default_timeout.assert_called_once_with(5000)
+    page.set_default_navigation_timeout.assert_called_once_with(5000)
+    browser.close.assert_called_once()